@@ -12,6 +12,16 @@ PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
 You should have received a copy of the GNU Affero General Public License along
 with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
 """
-from . import base, run
+from . import base, cache, cluster, conf, logs, metric, page, pool, run
 
-__all__ = ["base", "run"]
+__all__ = [
+    "base",
+    "cache",
+    "cluster",
+    "conf",
+    "logs",
+    "metric",
+    "page",
+    "pool",
+    "run",
+]
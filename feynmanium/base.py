@@ -12,43 +12,296 @@ PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
 You should have received a copy of the GNU Affero General Public License along
 with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
 """
+import asyncio
+import dataclasses
+import importlib
+import logging
+import pathlib
 import secrets
+import signal
+import time
 import typing
 
 import discord
+from discord import app_commands
 from discord.ext import commands
 
+from . import conf, logs, metric, pool
+
+log = logging.getLogger(__name__)
+
+
+class Context(commands.Context["Bot"]):
+    """Context that times messages sent to Discord.
+
+    Attributes:
+        span: Span of the command, None if not running.
+    """
+
+    span: typing.Optional[metric.Span] = None
+
+    async def send(self, *args, **kwargs) -> discord.Message:
+        """Sends a message and adds its duration to the send phase.
+
+        Args:
+            args: Positional arguments.
+            kwargs: Keyword arguments.
+
+        Returns:
+            The message sent.
+        """
+        with metric.timer("send"):
+            return await super().send(*args, **kwargs)
+
+
+class Tree(app_commands.CommandTree):
+    """Command tree that loads lazy extensions on demand."""
+
+    async def interaction_check(self, interaction: discord.Interaction, /):
+        """Loads the extension of an application command before it runs.
+
+        Args:
+            interaction: Interaction of the command.
+
+        Returns:
+            Whether to run the command.
+        """
+        if (
+            isinstance(self.client, Bot)
+            and interaction.type
+            in (
+                discord.InteractionType.application_command,
+                discord.InteractionType.autocomplete,
+            )
+            and interaction.data is not None
+        ):
+            ext = self.client.lazy.get(str(interaction.data.get("name")))
+            if ext is not None:
+                await self.client.warm(ext)
+        return True
+
 
 class Bot(commands.AutoShardedBot):
     """The bot client.
 
     Attributes:
         cfg: Configuration of the bot.
+        path: File to reload configuration from.
         glds: Guilds the bot belongs to.
+        lazy: Extensions not loaded yet by their command names.
+        locks: Locks to load extensions.
+        time: Seconds taken to load extensions.
+        bg: Background tasks to keep alive.
+        metrics: Metrics of commands.
     """
 
     def __init__(
-        self, *args, config, guilds: typing.List[discord.Object], **kwargs
+        self,
+        *args,
+        config: conf.Config,
+        path: pathlib.Path,
+        guilds: typing.List[discord.Object],
+        **kwargs,
     ):
         """Initialize the bot with a configuration.
 
         Args:
             args: Positional arguments.
             config: Configuration of the bot.
+            path: File to reload configuration from.
             guilds: Guilds the bot belongs to.
             kwargs: Keyword arguments.
         """
         self.cfg = config
+        self.path = path
         self.glds = guilds
-        super().__init__(*args, **kwargs)
+        self.lazy: typing.Dict[str, str] = {}
+        self.locks: typing.Dict[str, asyncio.Lock] = {}
+        self.time: typing.Dict[str, float] = {}
+        self.bg: typing.Set[asyncio.Task] = set()
+        self.metrics = metric.Metrics()
+        super().__init__(*args, tree_cls=Tree, **kwargs)
+        self.before_invoke(self.begin)
+        self.after_invoke(self.finish)
+
+    async def get_context(self, origin, /, *, cls=Context):
+        """Creates a context that times messages sent to Discord.
+
+        Args:
+            origin: Message or interaction of the context.
+            cls: Class of the context.
+
+        Returns:
+            The context.
+        """
+        return await super().get_context(origin, cls=cls)
+
+    async def begin(self, ctx: commands.Context):
+        """Starts the span of a command and claims its engine requests.
+
+        Stubs get no span, since the command they run again has its own.
+
+        Args:
+            ctx: Context of the command.
+        """
+        if (
+            isinstance(ctx, Context)
+            and ctx.command is not None
+            and not ctx.command.extras.get("stub")
+        ):
+            queue = discord.utils.utcnow() - ctx.message.created_at
+            ctx.span = self.metrics.begin(
+                ctx.command.qualified_name, queue.total_seconds()
+            )
+        pool.CLAIM.set(
+            pool.Claim(
+                ctx.guild.id if ctx.guild else 0, ctx.author.id, pool.LOOK
+            )
+        )
+
+    async def finish(self, ctx: commands.Context):
+        """Ends the span of a command unless it has ended.
+
+        Args:
+            ctx: Context of the command.
+        """
+        if (
+            isinstance(ctx, Context)
+            and ctx.span is not None
+            and ctx.command is not None
+        ):
+            self.metrics.end(ctx.command.qualified_name, ctx.span)
+            ctx.span = None
 
     async def setup_hook(self):
         """Set up the bot."""
         self.add_command(load)
         self.add_command(sync)
-        for cog in self.cfg["feynmanium"]["base"]["exts"]:
-            await self.load_extension(cog)
-        print(secrets.choice(self.cfg["feynmanium"]["base"]["rdy"]))
+        self.add_command(reconf)
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGHUP, lambda: self.spawn(self.reload())
+        )
+        mani: typing.Mapping[str, typing.Tuple[str, ...]] = {}
+        if self.cfg.base.lazy:
+            mani = self.cfg.base.mani
+        for ext in self.cfg.base.exts:
+            if ext in mani:
+                for name in mani[ext]:
+                    self.lazy[name] = ext
+                    self.add_command(stub(name, ext))
+            else:
+                await self.warm(ext)
+        if self.lazy:
+            self.spawn(self.warm_all())
+        if self.cfg.metric.port:
+            await self.metrics.serve(self.cfg.metric.host, self.cfg.metric.port)
+        print(secrets.choice(self.cfg.base.rdy))
+
+    async def close(self):
+        """Stops the metrics endpoint and closes the bot."""
+        asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+        await self.metrics.close()
+        await super().close()
+
+    def spawn(self, coro: typing.Coroutine):
+        """Runs a coroutine as a background task.
+
+        Args:
+            coro: Coroutine to run.
+        """
+        task = asyncio.create_task(coro)
+        self.bg.add(task)
+        task.add_done_callback(self.bg.discard)
+
+    async def reload(self) -> typing.Optional[str]:
+        """Reloads the configuration file and swaps the snapshot.
+
+        The file is read and validated in a thread, and the old snapshot is
+        kept if it is invalid. Cogs are notified with the config_reload
+        event, called with the old and the new snapshot. The metrics endpoint
+        is kept, and sizes of pools and caches take effect when their
+        extension is reloaded.
+
+        Returns:
+            The error in the configuration, None if it was reloaded.
+        """
+        try:
+            new = await asyncio.get_running_loop().run_in_executor(
+                None, conf.load, self.path
+            )
+            logs.tune(new.log)
+        except (OSError, ValueError) as exc:
+            log.error("Failed to reload configuration: %s", exc)
+            return str(exc)
+        new = dataclasses.replace(new, metric=self.cfg.metric)
+        old, self.cfg = self.cfg, new
+        self.dispatch("config_reload", old, new)
+        log.info("Reloaded configuration from %s", self.path)
+        return None
+
+    async def warm(self, ext: str):
+        """Loads an extension unless it is loaded, replacing its stubs.
+
+        The module is imported in a thread first, so its dependencies are
+        cached before the extension is loaded on the event loop.
+
+        Args:
+            ext: Extension to load.
+        """
+        async with self.locks.setdefault(ext, asyncio.Lock()):
+            if ext in self.extensions:
+                return
+            names = [
+                name for (name, value) in self.lazy.items() if value == ext
+            ]
+            for name in names:
+                self.remove_command(name)
+            start = time.perf_counter()
+            try:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, importlib.import_module, ext
+                )
+                await self.load_extension(ext)
+            except BaseException:
+                for name in names:
+                    self.add_command(stub(name, ext))
+                raise
+            for name in names:
+                del self.lazy[name]
+            self.time[ext] = time.perf_counter() - start
+            log.info("Loaded extension %s in %.3f s", ext, self.time[ext])
+
+    async def warm_all(self):
+        """Loads every lazy extension in the background after ready."""
+        await self.wait_until_ready()
+        for ext in dict.fromkeys(self.lazy.values()):
+            try:
+                await self.warm(ext)
+            except commands.ExtensionError:
+                log.exception("Failed to load extension %s", ext)
+
+
+def stub(name: str, ext: str) -> commands.Command:
+    """Creates a command that loads its extension and runs again.
+
+    Args:
+        name: Name of the command.
+        ext: Extension of the command.
+
+    Returns:
+        The stub command.
+    """
+
+    async def callback(ctx: commands.Context[Bot]):
+        await ctx.bot.warm(ext)
+        await ctx.bot.invoke(await ctx.bot.get_context(ctx.message))
+
+    return commands.Command(
+        callback,
+        name=name,
+        help=f"Loads {ext} and runs this command.",
+        extras={"stub": True},
+    )
 
 
 @commands.command()
@@ -59,7 +312,10 @@ async def load(ctx: commands.Context[Bot], ext: str):
         ctx: Context of the command.
         ext: Extension to load.
     """
-    await ctx.bot.load_extension(ext)
+    if ext in ctx.bot.lazy.values():
+        await ctx.bot.warm(ext)
+    else:
+        await ctx.bot.load_extension(ext)
     await ctx.send(f"Extension {ext} loaded!")
 
 
@@ -71,8 +327,25 @@ async def sync(ctx: commands.Context[Bot], gld: typing.Optional[discord.Guild]):
         ctx: Context of the command.
         gld: Guild to sync commands.
     """
+    for ext in set(ctx.bot.lazy.values()):
+        await ctx.bot.warm(ext)
     if gld is None:
         await ctx.bot.tree.sync()
     else:
         await ctx.bot.tree.sync(guild=gld)
     await ctx.send(f"Synced commands for {gld}!")
+
+
+@commands.command()
+@commands.is_owner()
+async def reconf(ctx: commands.Context[Bot]):
+    """Reloads configuration.
+
+    Args:
+        ctx: Context of the command.
+    """
+    error = await ctx.bot.reload()
+    if error is None:
+        await ctx.send("Configuration reloaded!")
+    else:
+        await ctx.send(f"Configuration kept: {error}")
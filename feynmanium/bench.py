@@ -0,0 +1,558 @@
+"""This file is part of Feynmanium.
+
+Feynmanium is free software: you can redistribute it and/or modify it under the
+terms of the GNU Affero General Public License as published by the Free Software
+Foundation, either version 3 of theLicense, or (at your option) any later
+version.
+
+Feynmanium is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
+"""
+import argparse
+import asyncio
+import contextlib
+import dataclasses
+import io
+import json
+import pathlib
+import platform
+import statistics
+import sys
+import time
+import types
+import typing
+
+import chess
+import discord
+from chess import pgn
+from discord.ext import commands
+
+from . import conf
+from .cogs import calc, game
+
+EXPRS = [
+    "x**2 + 2*x + 1",
+    "sin(x)**2 + cos(x)**2",
+    "(x**3 - 1)/(x - 1)",
+    "exp(x)*sin(x)",
+    "1/(x**2 + 1)",
+    "x**5 - x + 1",
+    "log(x)/x",
+    "(x + 1)**6 - x**6",
+]
+
+FENS = [
+    chess.STARTING_FEN,
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP3PPP/R2QKB1R w KQ - 0 8",
+    "8/5pk1/6p1/8/3R4/6P1/5PKP/3r4 b - - 0 40",
+]
+
+PGN = """[Event "Casual Game"]
+[Site "London"]
+[Date "1851.06.21"]
+[White "Anderssen, Adolf"]
+[Black "Kieseritzky, Lionel"]
+[Result "1-0"]
+
+1. e4 e5 2. f4 exf4 3. Bc4 Qh4+ (3... Nf6 4. Nc3 c6) 4. Kf1 b5 5. Bxb5 Nf6
+6. Nf3 Qh6 7. d3 Nh5 8. Nh4 Qg5 9. Nf5 c6 10. g4 Nf6 11. Rg1 cxb5 12. h4 Qg6
+13. h5 Qg5 14. Qf3 Ng8 15. Bxf4 Qf6 16. Nc3 Bc5 17. Nd5 Qxb2 18. Bd6 Bxg1
+(18... Qxa1+ 19. Ke2 Qb2) 19. e5 Qxa1+ 20. Ke2 Na6 21. Nxg7+ Kd8 22. Qf6+
+Nxf6 23. Be7# 1-0
+
+"""
+
+
+class Bot:
+    """Stand-in for the bot that loads extensions without Discord.
+
+    Attributes:
+        cfg: Configuration of the bot.
+        glds: Guilds the bot belongs to.
+        cogs: Loaded cogs by name.
+    """
+
+    def __init__(self, cfg: conf.Config):
+        """Initializes the bot.
+
+        Args:
+            cfg: Configuration of the bot.
+        """
+        self.cfg = cfg
+        self.glds: typing.List[discord.Object] = []
+        self.cogs: typing.Dict[str, commands.Cog] = {}
+
+    async def add_cog(self, cog: commands.Cog, **kwargs):
+        """Loads a cog.
+
+        Args:
+            cog: Cog to load.
+            kwargs: Options of the cog, ignored.
+        """
+        del kwargs
+        await discord.utils.maybe_coroutine(cog.cog_load)
+        self.cogs[cog.qualified_name] = cog
+
+    def get_cog(self, name: str) -> typing.Optional[commands.Cog]:
+        """Finds a loaded cog.
+
+        Args:
+            name: Name of the cog.
+
+        Returns:
+            The cog, None if not loaded.
+        """
+        return self.cogs.get(name)
+
+    async def remove_cog(self, name: str, **kwargs):
+        """Unloads a cog.
+
+        Args:
+            name: Name of the cog.
+            kwargs: Options of the cog, ignored.
+        """
+        del kwargs
+        cog = self.cogs.pop(name, None)
+        if cog is not None:
+            await discord.utils.maybe_coroutine(cog.cog_unload)
+
+    def add_view(self, view: discord.ui.View, **kwargs):
+        """Ignores a persistent view.
+
+        Args:
+            view: View to register.
+            kwargs: Options of the view.
+        """
+        del view, kwargs
+
+
+class Context:
+    """Stand-in for the context of a command.
+
+    Attributes:
+        bot: Bot of the command.
+        author: Author of the command.
+        channel: Channel of the command.
+        guild: Guild of the command.
+        interaction: Interaction of the command, None for messages.
+        sent: Keyword arguments of the messages sent.
+    """
+
+    def __init__(self, bot: Bot):
+        """Initializes the context.
+
+        Args:
+            bot: Bot of the command.
+        """
+        self.bot = bot
+        self.author = types.SimpleNamespace(id=0, name="bench")
+        self.channel = discord.Object(0)
+        self.guild = None
+        self.interaction = None
+        self.sent: typing.List[typing.Dict[str, typing.Any]] = []
+
+    async def send(
+        self, content: typing.Optional[str] = None, **kwargs
+    ) -> discord.Object:
+        """Records a message instead of sending it.
+
+        Args:
+            content: Content of the message.
+            kwargs: Other arguments of the message.
+
+        Returns:
+            A stand-in for the message.
+        """
+        self.sent.append(dict(kwargs, content=content))
+        return discord.Object(len(self.sent))
+
+    async def defer(self, **kwargs):
+        """Pretends to defer the response.
+
+        Args:
+            kwargs: Options of the response.
+        """
+        del kwargs
+
+
+class Interaction:
+    """Stand-in for an interaction with a view.
+
+    Attributes:
+        user: User of the interaction.
+        response: Response of the interaction.
+        ctx: Context that records the edits.
+    """
+
+    def __init__(self, ctx: Context):
+        """Initializes the interaction.
+
+        Args:
+            ctx: Context of the view.
+        """
+        self.user = ctx.author
+        self.response = ctx
+        self.ctx = ctx
+
+    async def edit_original_response(self, **kwargs):
+        """Records an edit instead of sending it.
+
+        Args:
+            kwargs: Arguments of the edit.
+        """
+        self.ctx.sent.append(kwargs)
+
+
+@contextlib.asynccontextmanager
+async def loaded(
+    ctx: Context, ext: types.ModuleType, name: str
+) -> typing.AsyncIterator[typing.Any]:
+    """Loads an extension on the stand-in bot for a block.
+
+    Args:
+        ctx: Context of the cases.
+        ext: Module of the extension.
+        name: Name of the cog.
+
+    Yields:
+        The cog of the extension.
+    """
+    await ext.setup(ctx.bot)
+    try:
+        yield ctx.bot.get_cog(name)
+    finally:
+        await ext.teardown(ctx.bot)
+
+
+def drop_views(ctx: Context):
+    """Stops the views sent in a context and forgets the messages.
+
+    Args:
+        ctx: Context of the views.
+    """
+    for sent in ctx.sent:
+        view = sent.get("view")
+        if isinstance(view, game.ChessView):
+            view.end()
+        elif isinstance(view, discord.ui.View):
+            view.stop()
+    ctx.sent.clear()
+
+
+class Runner:
+    """Runner that times cases and collects their statistics.
+
+    Attributes:
+        repeat: Number of runs of each case.
+        results: Statistics of the cases by name.
+    """
+
+    def __init__(self, repeat: int):
+        """Initializes the runner.
+
+        Args:
+            repeat: Number of runs of each case.
+        """
+        self.repeat = repeat
+        self.results: typing.Dict[str, typing.Dict[str, float]] = {}
+
+    async def time(
+        self, name: str, func: typing.Callable[[], typing.Awaitable[typing.Any]]
+    ):
+        """Times a case.
+
+        Args:
+            name: Name of the case.
+            func: Case to time.
+        """
+        runs = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            await func()
+            runs.append(time.perf_counter() - start)
+        self.results[name] = {
+            "runs": len(runs),
+            "min": min(runs),
+            "median": statistics.median(runs),
+            "mean": statistics.fmean(runs),
+        }
+        print(f"{name:<24}{self.results[name]['median'] * 1000:>12.3f} ms")
+
+
+async def bench_calc(runner: Runner, ctx: Context):
+    """Times the mathematical commands on the corpus of expressions.
+
+    Cold cases clear the plans and results first, so every expression is
+    planned and calculated by the workers. The warm case answers from the
+    cache.
+
+    Args:
+        runner: Runner of the cases.
+        ctx: Context of the cases.
+    """
+    async with loaded(ctx, calc, "Mathematics") as cog:
+
+        def run(command, *args, cold: bool = True):
+            async def case():
+                if cold:
+                    cog.keys.clear()
+                    cog.results.clear()
+                for expr in EXPRS:
+                    await command.callback(cog, ctx, *args, expr=expr)
+                ctx.sent.clear()
+
+            return case
+
+        await cog.simpl.callback(cog, ctx, expr="x")
+        await runner.time("calc.simpl", run(cog.simpl))
+        await runner.time("calc.adiff", run(cog.adiff, "x"))
+        await runner.time("calc.solve", run(cog.solve, "x"))
+        await runner.time("calc.zero", run(cog.zero, "-10", "10", "x"))
+        await runner.time("calc.warm", run(cog.simpl, cold=False))
+
+
+async def bench_render(runner: Runner, ctx: Context):
+    """Times the rendering of boards with and without the cache.
+
+    Args:
+        runner: Runner of the cases.
+        ctx: Context of the cases.
+    """
+    boards = [chess.Board(fen) for fen in FENS]
+    async with loaded(ctx, game, "Chessboard") as cog:
+
+        def run(cold: bool):
+            async def case():
+                if cold:
+                    cog.imgs.cache.clear()
+                for board in boards:
+                    await cog.imgs.render(board, chess.WHITE)
+
+            return case
+
+        await runner.time("render.cold", run(True))
+        await runner.time("render.warm", run(False))
+
+
+async def bench_view(runner: Runner, ctx: Context):
+    """Times the generation of the move lists of the chess view.
+
+    Args:
+        runner: Runner of the cases.
+        ctx: Context of the views.
+    """
+    async with loaded(ctx, game, "Chessboard") as cog:
+        views = []
+        for fen in FENS:
+            session = game.Session(0, "", "", chess.WHITE, 1, fen)
+            views.append((cog.get_view(session), session))
+
+        async def update():
+            for view, session in views:
+                view.update(session.board(), "")
+
+        try:
+            await runner.time("view.update", update)
+        finally:
+            for view, _ in views:
+                view.end()
+
+
+async def bench_pgn(runner: Runner, ctx: Context):
+    """Times the loading and navigation of PGNs.
+
+    Args:
+        runner: Runner of the cases.
+        ctx: Context of the views.
+    """
+    text = PGN * 100
+    node = pgn.read_game(io.StringIO(PGN))
+    assert node is not None
+    async with loaded(ctx, game, "Chessboard") as cog:
+
+        async def index():
+            game.get_index(io.StringIO(text))
+
+        async def send():
+            await game.send_game(ctx, node, images=cog.imgs)
+            drop_views(ctx)
+
+        async def walk():
+            await game.send_game(ctx, node, images=cog.imgs)
+            view = ctx.sent[-1]["view"]
+            while not view.node.is_end():
+                await view.next.callback(Interaction(ctx))
+            drop_views(ctx)
+
+        await runner.time("pgn.index", index)
+        await runner.time("pgn.send", send)
+        await runner.time("pgn.walk", walk)
+
+
+async def bench_engine(runner: Runner, ctx: Context):
+    """Times the first move of games at several skill levels.
+
+    Games start through the chess command, so every level uses its search
+    limits and the engine pool of the configuration.
+
+    Args:
+        runner: Runner of the cases.
+        ctx: Context of the games.
+    """
+    async with loaded(ctx, game, "Chessboard") as cog:
+
+        def run(level: int):
+            async def case():
+                await cog.chess.callback(cog, ctx, level, False)
+                drop_views(ctx)
+
+            return case
+
+        for level in (1, 10, 20):
+            await runner.time(f"engine.level{level}", run(level))
+
+
+GROUPS: typing.Dict[
+    str, typing.Callable[[Runner, Context], typing.Awaitable[None]]
+] = {
+    "calc": bench_calc,
+    "render": bench_render,
+    "view": bench_view,
+    "pgn": bench_pgn,
+    "engine": bench_engine,
+}
+
+
+async def bench(
+    cfg: conf.Config, repeat: int, names: typing.List[str]
+) -> typing.Dict[str, typing.Dict[str, float]]:
+    """Runs the benchmarks.
+
+    The stores, the book and the tablebases are disabled, so the cases leave
+    the files of the bot alone and every move is searched by stockfish.
+
+    Args:
+        cfg: Configuration of the bot.
+        repeat: Number of runs of each case.
+        names: Groups of cases to run.
+
+    Returns:
+        The statistics of the cases by name.
+    """
+    runner = Runner(repeat)
+    cogs = cfg.cogs
+    ctx = Context(
+        Bot(
+            dataclasses.replace(
+                cfg,
+                cogs=dataclasses.replace(
+                    cogs,
+                    calc=dataclasses.replace(cogs.calc, file=""),
+                    game=dataclasses.replace(
+                        cogs.game, file="", sess="", book="", tbs=""
+                    ),
+                ),
+            )
+        )
+    )
+    for name in names:
+        await GROUPS[name](runner, ctx)
+    return runner.results
+
+
+def compare(
+    results: typing.Dict[str, typing.Dict[str, float]],
+    base: typing.Dict[str, typing.Dict[str, float]],
+    tolerance: float,
+) -> typing.List[str]:
+    """Finds the cases that became slower than a previous run.
+
+    Args:
+        results: Statistics of this run.
+        base: Statistics of the previous run.
+        tolerance: Allowed slowdown of the median as a fraction.
+
+    Returns:
+        The descriptions of the regressions.
+    """
+    regressions = []
+    for name, stat in results.items():
+        if name in base:
+            ratio = stat["median"] / base[name]["median"]
+            if ratio > 1 + tolerance:
+                regressions.append(f"{name} is {ratio:.2f}x slower")
+    return regressions
+
+
+def main():
+    """Execute the benchmarks."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-c",
+        "--conf-file",
+        default="config.toml",
+        type=pathlib.Path,
+        help="the file to read configuration",
+    )
+    parser.add_argument(
+        "-o",
+        "--out-file",
+        default="bench.json",
+        type=pathlib.Path,
+        help="the file to write results",
+    )
+    parser.add_argument(
+        "-b",
+        "--base-file",
+        type=pathlib.Path,
+        help="the file of a previous run to compare with",
+    )
+    parser.add_argument(
+        "-t",
+        "--tolerance",
+        default=0.2,
+        type=float,
+        help="the allowed slowdown as a fraction",
+    )
+    parser.add_argument(
+        "-r", "--repeat", default=5, type=int, help="the runs of each case"
+    )
+    parser.add_argument(
+        "groups",
+        nargs="*",
+        help="the groups of cases to run, all if none is given",
+    )
+    args = parser.parse_args()
+    groups = args.groups or list(GROUPS)
+    for name in groups:
+        if name not in GROUPS:
+            parser.error(f"unknown group {name}")
+    config = conf.load(args.conf_file)
+    results = asyncio.run(bench(config, args.repeat, groups))
+    args.out_file.write_text(
+        json.dumps(
+            {
+                "python": platform.python_version(),
+                "chess": chess.__version__,
+                "time": time.time(),
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+    if args.base_file is not None:
+        base = json.loads(args.base_file.read_text())["results"]
+        regressions = compare(results, base, args.tolerance)
+        for regression in regressions:
+            print(regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
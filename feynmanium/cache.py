@@ -0,0 +1,194 @@
+"""This file is part of Feynmanium.
+
+Feynmanium is free software: you can redistribute it and/or modify it under the
+terms of the GNU Affero General Public License as published by the Free Software
+Foundation, either version 3 of theLicense, or (at your option) any later
+version.
+
+Feynmanium is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
+"""
+import collections
+import pickle
+import sqlite3
+import time
+import typing
+
+
+def weigh(value: typing.Any) -> int:
+    """Estimates the size of a value.
+
+    Args:
+        value: Value to weigh.
+
+    Returns:
+        The size of the pickled value in bytes.
+    """
+    return len(pickle.dumps(value))
+
+
+class Cache:
+    """Least recently used cache with an optional SQLite store.
+
+    Entries are evicted from memory when either the number of entries or
+    their total size exceeds its limit. Evicted entries stay in the store,
+    which is trimmed to the same number of entries. Entries older than the
+    time to live are treated as missing.
+
+    Attributes:
+        size: Maximum number of entries, 0 for unlimited.
+        budget: Maximum total size of entries in bytes, 0 for unlimited.
+        ttl: Time to live of entries in seconds, 0 for unlimited.
+        weigh: Function to estimate the size of a value.
+        data: Entries with their sizes and creation times, least recently
+            used first.
+        used: Total size of entries in memory.
+        hits: Number of lookups that found an entry.
+        misses: Number of lookups that found nothing.
+        conn: Connection to the store, None if not persisted.
+        puts: Number of writes since the store was last trimmed.
+    """
+
+    def __init__(
+        self,
+        size: int = 0,
+        budget: int = 0,
+        path: str = "",
+        weigh_: typing.Callable[[typing.Any], int] = weigh,
+        ttl: float = 0,
+    ):
+        """Initializes the cache.
+
+        Args:
+            size: Maximum number of entries, 0 for unlimited.
+            budget: Maximum total size of entries in bytes, 0 for unlimited.
+            path: Path of the SQLite store, empty to keep entries in memory.
+            weigh_: Function to estimate the size of a value.
+            ttl: Time to live of entries in seconds, 0 for unlimited.
+        """
+        self.size, self.budget, self.weigh = size, budget, weigh_
+        self.ttl = ttl
+        self.data: collections.OrderedDict[
+            str, typing.Tuple[typing.Any, int, float]
+        ] = collections.OrderedDict()
+        self.used = self.hits = self.misses = self.puts = 0
+        self.conn: typing.Optional[sqlite3.Connection] = None
+        if path:
+            self.conn = sqlite3.connect(path)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache"
+                "(key TEXT PRIMARY KEY, value BLOB, time REAL)"
+            )
+            self.conn.commit()
+
+    def __len__(self) -> int:
+        """Counts the entries in memory.
+
+        Returns:
+            The number of entries in memory.
+        """
+        return len(self.data)
+
+    def get(self, key: str) -> typing.Any:
+        """Looks up an entry.
+
+        Args:
+            key: Key of the entry.
+
+        Returns:
+            The value of the entry, None if not found.
+        """
+        now = time.time()
+        if key in self.data:
+            value, _, made = self.data[key]
+            if self.ttl <= 0 or now - made < self.ttl:
+                self.data.move_to_end(key)
+                self.hits += 1
+                return value
+            self.used -= self.data.pop(key)[1]
+        if self.conn is not None:
+            row = self.conn.execute(
+                "SELECT value, time FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and (self.ttl <= 0 or now - row[1] < self.ttl):
+                self.hits += 1
+                value = pickle.loads(row[0])
+                self.keep(key, value, row[1])
+                return value
+        self.misses += 1
+        return None
+
+    def keep(self, key: str, value: typing.Any, made: float):
+        """Stores an entry in memory and evicts old entries.
+
+        Args:
+            key: Key of the entry.
+            value: Value of the entry.
+            made: Creation time of the entry.
+        """
+        if key in self.data:
+            self.used -= self.data.pop(key)[1]
+        weight = self.weigh(value)
+        self.data[key] = (value, weight, made)
+        self.used += weight
+        while self.data and (
+            0 < self.size < len(self.data) or 0 < self.budget < self.used
+        ):
+            self.used -= self.data.popitem(last=False)[1][1]
+
+    def put(self, key: str, value: typing.Any):
+        """Stores an entry.
+
+        Args:
+            key: Key of the entry.
+            value: Value of the entry.
+        """
+        now = time.time()
+        self.keep(key, value, now)
+        if self.conn is not None:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                (key, pickle.dumps(value), now),
+            )
+            self.puts += 1
+            if 0 < self.size <= self.puts:
+                self.conn.execute(
+                    "DELETE FROM cache WHERE key NOT IN "
+                    "(SELECT key FROM cache ORDER BY time DESC LIMIT ?)",
+                    (self.size,),
+                )
+                self.puts = 0
+            self.conn.commit()
+
+    def clear(self):
+        """Forgets every entry, in memory and in the store."""
+        self.data.clear()
+        self.used = self.puts = 0
+        if self.conn is not None:
+            self.conn.execute("DELETE FROM cache")
+            self.conn.commit()
+
+    def stat(self) -> str:
+        """Summarizes the cache.
+
+        Returns:
+            The summary of the cache.
+        """
+        total = self.hits + self.misses
+        rate = round(self.hits / total * 100, 2) if total else 0
+        return (
+            f"{len(self.data)} entries, {self.used} bytes, "
+            f"{self.hits} hits, {self.misses} misses ({rate}%)"
+        )
+
+    def close(self):
+        """Closes the store."""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
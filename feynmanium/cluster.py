@@ -0,0 +1,433 @@
+"""This file is part of Feynmanium.
+
+Feynmanium is free software: you can redistribute it and/or modify it under the
+terms of the GNU Affero General Public License as published by the Free Software
+Foundation, either version 3 of theLicense, or (at your option) any later
+version.
+
+Feynmanium is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import contextlib
+import logging
+import math
+import multiprocessing
+import os
+import re
+import signal
+import time
+import typing
+from multiprocessing import connection
+
+from . import base, conf, metric
+
+log = logging.getLogger(__name__)
+
+T = typing.TypeVar("T")
+
+
+def split(items: typing.List[T], parts: int) -> typing.List[typing.List[T]]:
+    """Splits items into contiguous parts of nearly equal sizes.
+
+    Args:
+        items: Items to split.
+        parts: Number of parts.
+
+    Returns:
+        The parts, larger ones first.
+    """
+    size, rest = divmod(len(items), parts)
+    result = []
+    start = 0
+    for idx in range(parts):
+        stop = start + size + (idx < rest)
+        result.append(items[start:stop])
+        start = stop
+    return result
+
+
+def label(text: str, name: str, value: str) -> typing.List[str]:
+    """Adds a label to every sample of metrics in the Prometheus format.
+
+    Args:
+        text: Exposed metrics.
+        name: Name of the label.
+        value: Value of the label.
+
+    Returns:
+        The lines of the labelled metrics.
+    """
+    lines = []
+    for line in text.splitlines():
+        match = re.fullmatch(r"([^{\s]+)(?:\{(.*)\})? (\S+)", line)
+        if match is None:
+            lines.append(line)
+            continue
+        metric_name, labels, sample = match.groups()
+        labels = f'{name}="{value}"' + (f",{labels}" if labels else "")
+        lines.append(f"{metric_name}{{{labels}}} {sample}")
+    return lines
+
+
+async def report(bot: base.Bot, conn: connection.Connection, every: float):
+    """Sends the status and the metrics of a worker to the supervisor.
+
+    Args:
+        bot: Bot of the worker.
+        conn: Pipe to the supervisor.
+        every: Seconds between reports.
+    """
+    while True:
+        latency = bot.latency
+        conn.send(
+            {
+                "ready": bot.is_ready(),
+                "shards": list(bot.shard_ids or []),
+                "count": bot.shard_count,
+                "guilds": len(bot.guilds),
+                "latency": latency if math.isfinite(latency) else 0.0,
+                "metrics": bot.metrics.text(),
+            }
+        )
+        await asyncio.sleep(every)
+
+
+async def serve(
+    bot: base.Bot,
+    conn: connection.Connection,
+    token: str,
+    dry: bool,
+    every: float,
+):
+    """Runs the bot of a worker until the supervisor stops it.
+
+    In a dry run the bot is set up without connecting to Discord and stands
+    in for a ready bot with no guilds. It still reports the shards it was
+    given, so the supervisor checks their assignment.
+
+    Args:
+        bot: Bot of the worker.
+        conn: Pipe to the supervisor.
+        token: Token of the bot.
+        dry: Whether to skip connecting to Discord.
+        every: Seconds between reports.
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    loop.add_signal_handler(signal.SIGTERM, stop.set)
+    async with bot:
+        if dry:
+            await bot.setup_hook()
+            bot.is_ready = lambda: True  # type: ignore[method-assign]
+            main = asyncio.create_task(stop.wait())
+        else:
+            main = asyncio.create_task(bot.start(token))
+        beat = asyncio.create_task(report(bot, conn, every))
+        halt = asyncio.create_task(stop.wait())
+        await asyncio.wait({main, halt}, return_when=asyncio.FIRST_COMPLETED)
+        beat.cancel()
+        halt.cancel()
+        if main.done():
+            main.result()
+        else:
+            main.cancel()
+
+
+class Member:
+    """Worker process of a cluster.
+
+    Attributes:
+        ids: Shards of the worker.
+        proc: Process of the worker, None if not running.
+        conn: Pipe from the worker, None if not running.
+        seen: Time of the last report or start.
+        stat: Last report of the worker.
+        fails: Number of failures since the worker was last ready.
+        starts: Number of starts.
+        due: Time to restart the worker, 0 if running.
+    """
+
+    def __init__(self, ids: typing.List[int]):
+        """Initializes a worker that is not running.
+
+        Args:
+            ids: Shards of the worker.
+        """
+        self.ids = ids
+        self.proc: typing.Optional[multiprocessing.Process] = None
+        self.conn: typing.Optional[connection.Connection] = None
+        self.seen = 0.0
+        self.stat: typing.Dict[str, typing.Any] = {}
+        self.fails = self.starts = 0
+        self.due = 0.0
+
+    def name(self) -> str:
+        """Describes the shards of the worker.
+
+        Returns:
+            The range of the shards.
+        """
+        if not self.ids:
+            return "-"
+        if len(self.ids) == 1:
+            return str(self.ids[0])
+        return f"{self.ids[0]}-{self.ids[-1]}"
+
+
+class Combined(metric.Metrics):
+    """Metrics of every worker of a cluster.
+
+    Attributes:
+        members: Workers of the cluster.
+    """
+
+    def __init__(self, members: typing.List[Member]):
+        """Initializes the metrics.
+
+        Args:
+            members: Workers of the cluster.
+        """
+        super().__init__()
+        self.members = members
+
+    def text(self) -> str:
+        """Exposes the metrics of the workers, labelled by their shards.
+
+        Returns:
+            The exposed metrics.
+        """
+        lines = []
+        kinds = set()
+        for member in self.members:
+            for line in label(
+                member.stat.get("metrics", ""), "shards", member.name()
+            ):
+                if line.startswith("#"):
+                    if line in kinds:
+                        continue
+                    kinds.add(line)
+                lines.append(line)
+        for kind, key, func in (
+            ("gauge", "up", lambda member: int(member.due == 0)),
+            ("gauge", "guilds", lambda member: member.stat.get("guilds", 0)),
+            (
+                "gauge",
+                "latency_seconds",
+                lambda member: member.stat.get("latency", 0.0),
+            ),
+            ("counter", "starts_total", lambda member: member.starts),
+        ):
+            lines.append(f"# TYPE feynmanium_worker_{key} {kind}")
+            for member in self.members:
+                lines.append(
+                    f'feynmanium_worker_{key}{{shards="{member.name()}"}} '
+                    f"{func(member)}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def table(self) -> str:
+        """Summarizes the workers for humans.
+
+        Returns:
+            The summary of the workers.
+        """
+        lines = [
+            f"{'shards':<12}{'pid':>8}{'up':>4}{'ready':>7}"
+            f"{'guilds':>8}{'ping':>8}{'starts':>8}"
+        ]
+        for member in self.members:
+            pid = member.proc.pid if member.proc is not None else 0
+            lines.append(
+                f"{member.name():<12}{pid or '-':>8}"
+                f"{'yes' if member.due == 0 else 'no':>4}"
+                f"{'yes' if member.stat.get('ready') else 'no':>7}"
+                f"{member.stat.get('guilds', 0):>8}"
+                f"{member.stat.get('latency', 0.0):>8.3f}{member.starts:>8}"
+            )
+        return "\n".join(lines)
+
+
+class Cluster:
+    """Supervisor of worker processes that run the shards of the bot.
+
+    Workers report their status and metrics over pipes. A worker that
+    exits or stops reporting is killed and restarted with exponential
+    backoff. The metrics of every worker are exposed on one endpoint, and
+    SIGHUP is passed on to the workers to reload their configuration.
+
+    Attributes:
+        cfg: Configuration of the cluster.
+        port: Configuration of the metrics endpoint.
+        target: Entry point of workers.
+        args: Arguments of workers before their shards.
+        count: Total number of shards.
+        ctx: Multiprocessing context to start workers with.
+        members: Workers of the cluster.
+        metrics: Metrics of every worker.
+    """
+
+    def __init__(
+        self,
+        config: conf.Config,
+        target: typing.Callable[..., None],
+        args: tuple,
+        groups: typing.List[typing.List[int]],
+        count: int,
+    ):
+        """Initializes the cluster without starting any worker.
+
+        Args:
+            config: Configuration of the bot.
+            target: Entry point of workers, called with the pipe to the
+                supervisor, the arguments, the shards and the total number
+                of shards.
+            args: Arguments of workers before their shards.
+            groups: Shards of each worker.
+            count: Total number of shards.
+        """
+        self.cfg = config.cluster
+        self.port = config.metric
+        self.target, self.args, self.count = target, args, count
+        self.ctx: typing.Any = multiprocessing.get_context("spawn")
+        self.members = [Member(ids) for ids in groups]
+        self.metrics = Combined(self.members)
+
+    def start(self, member: Member):
+        """Starts a worker.
+
+        Args:
+            member: Worker to start.
+        """
+        conn, child = self.ctx.Pipe(duplex=False)
+        member.proc = self.ctx.Process(
+            target=self.target, args=(child, *self.args, member.ids, self.count)
+        )
+        member.proc.start()
+        child.close()
+        member.conn = conn
+        member.seen = time.monotonic()
+        member.starts += 1
+        member.due = 0.0
+        asyncio.get_running_loop().add_reader(conn.fileno(), self.read, member)
+        log.info("Started shards %s as %d", member.name(), member.proc.pid)
+
+    def read(self, member: Member):
+        """Reads the reports of a worker.
+
+        Args:
+            member: Worker to read.
+        """
+        if member.conn is None:
+            return
+        try:
+            while member.conn.poll():
+                first = "shards" not in member.stat
+                member.stat = member.conn.recv()
+                member.seen = time.monotonic()
+                if first and (
+                    member.stat.get("shards"),
+                    member.stat.get("count"),
+                ) != (member.ids, self.count):
+                    log.error(
+                        "Shards %s run %s of %s shards",
+                        member.name(),
+                        member.stat.get("shards"),
+                        member.stat.get("count"),
+                    )
+                if member.stat.get("ready"):
+                    member.fails = 0
+        except (EOFError, OSError):
+            asyncio.get_running_loop().remove_reader(member.conn.fileno())
+
+    async def kill(self, member: Member):
+        """Stops a worker without blocking the event loop.
+
+        The worker is terminated and killed if it has not exited in time.
+
+        Args:
+            member: Worker to stop.
+        """
+        if member.conn is not None:
+            with contextlib.suppress(OSError, ValueError):
+                asyncio.get_running_loop().remove_reader(member.conn.fileno())
+            member.conn.close()
+            member.conn = None
+        if member.proc is not None:
+            proc, member.proc = member.proc, None
+            proc.terminate()
+            until = time.monotonic() + self.cfg.wait
+            while proc.is_alive() and time.monotonic() < until:
+                await asyncio.sleep(0.1)
+            if proc.is_alive():
+                proc.kill()
+            await asyncio.get_running_loop().run_in_executor(None, proc.join)
+
+    async def check(self, member: Member):
+        """Restarts a worker that has exited or stopped reporting.
+
+        Args:
+            member: Worker to check.
+        """
+        now = time.monotonic()
+        if member.due == 0:
+            alive = member.proc is not None and member.proc.is_alive()
+            if alive and now - member.seen <= self.cfg.wait:
+                return
+            log.warning("Shards %s are down", member.name())
+            await self.kill(member)
+            member.stat = {}
+            member.due = now + min(2**member.fails, 60)
+            member.fails += 1
+        elif now >= member.due:
+            self.start(member)
+
+    def hangup(self):
+        """Asks every running worker to reload its configuration.
+
+        Workers that have not reported yet are skipped, since they may not
+        handle the signal yet and read the configuration as they start.
+        """
+        for member in self.members:
+            if (
+                member.stat
+                and member.proc is not None
+                and member.proc.pid is not None
+            ):
+                with contextlib.suppress(ProcessLookupError):
+                    os.kill(member.proc.pid, signal.SIGHUP)
+
+    async def main(self):
+        """Runs the workers until the supervisor is interrupted."""
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        loop.add_signal_handler(signal.SIGHUP, self.hangup)
+        if self.port.port:
+            await self.metrics.serve(self.port.host, self.port.port)
+        for member in self.members:
+            self.start(member)
+        shown = time.monotonic()
+        try:
+            while not stop.is_set():
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(stop.wait(), 1)
+                for member in self.members:
+                    await self.check(member)
+                if time.monotonic() - shown >= self.cfg.show:
+                    shown = time.monotonic()
+                    log.info("Cluster status:\n%s", self.metrics.table())
+        finally:
+            await asyncio.gather(
+                *(self.kill(member) for member in self.members)
+            )
+            await self.metrics.close()
+
+    def run(self):
+        """Runs the workers until the supervisor is interrupted."""
+        asyncio.run(self.main())
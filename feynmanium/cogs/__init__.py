@@ -1,4 +1,5 @@
-"""Init file for cogs."""
-from . import calc, game, misc, trans
+"""Init file for cogs.
 
+Cogs are loaded as extensions, so they are not imported here.
+"""
 __all__ = ["calc", "game", "misc", "trans"]
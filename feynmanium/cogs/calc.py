@@ -12,10 +12,19 @@ PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
 You should have received a copy of the GNU Affero General Public License along
 with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
 """
+import functools
+import io
+import math
+import operator
+import typing
+
+import cairosvg
+import discord
+import numpy
 import sympy
 from discord.ext import commands
 
-from .. import base
+from .. import base, cache, conf, page, pool
 
 
 def parse_raw(expr: str):
@@ -44,11 +53,620 @@ def pretty_eq(lhs, rhs) -> str:
     return f"```{result}```"
 
 
+def get_simpl(expr: str) -> str:
+    """Simplifies an expression.
+
+    Args:
+        expr: Expression to simplify.
+
+    Returns:
+        The prettified result.
+    """
+    raw_expr = parse_raw(expr)
+    return pretty_eq(raw_expr, sympy.simplify(raw_expr, ratio=sympy.oo))
+
+
+def get_expn(expr: str) -> str:
+    """Expands an expression.
+
+    Args:
+        expr: Expression to expand.
+
+    Returns:
+        The prettified result.
+    """
+    raw_expr = parse_raw(expr)
+    return pretty_eq(raw_expr, sympy.expand(raw_expr))
+
+
+def get_fact(expr: str) -> str:
+    """Factors an expression.
+
+    Args:
+        expr: Expression to factor.
+
+    Returns:
+        The prettified result.
+    """
+    raw_expr = parse_raw(expr)
+    return pretty_eq(raw_expr, sympy.factor(raw_expr))
+
+
+def get_apart(expr: str) -> str:
+    """Decomposes an expression into partial fractions.
+
+    Args:
+        expr: Expression to decompose.
+
+    Returns:
+        The prettified result.
+    """
+    raw_expr = parse_raw(expr)
+    return pretty_eq(raw_expr, sympy.apart(raw_expr))
+
+
+def get_diff(var: str, expr: str) -> str:
+    """Calculates the derivative of an expression.
+
+    Args:
+        var: Variable to calculate derivatives.
+        expr: Expression to calculate derivatives.
+
+    Returns:
+        The prettified result.
+    """
+    raw_var = parse_raw(var)
+    raw_expr = parse_raw(expr)
+    return pretty_eq(
+        sympy.Derivative(raw_expr, raw_var), sympy.diff(raw_expr, raw_var)
+    )
+
+
+def get_adiff(var: str, expr: str) -> str:
+    """Calculates the integral of an expression.
+
+    Args:
+        var: Variable to calculate integrals.
+        expr: Expression to calculate integrals.
+
+    Returns:
+        The prettified result.
+    """
+    raw_var = parse_raw(var)
+    raw_expr = parse_raw(expr)
+    return pretty_eq(
+        sympy.Integral(raw_expr, raw_var), sympy.integrate(raw_expr, raw_var)
+    )
+
+
+def get_limit(pos: str, var: str, expr: str) -> str:
+    """Calculates the limit of an expression.
+
+    Args:
+        pos: Position to calculate limits.
+        var: Variable to calculate limits.
+        expr: Expression to calculate limits.
+
+    Returns:
+        The prettified result.
+    """
+    raw_var = parse_raw(var)
+    raw_pos = parse_raw(pos)
+    raw_expr = parse_raw(expr)
+    return pretty_eq(
+        sympy.Limit(raw_expr, raw_var, raw_pos),
+        sympy.limit(raw_expr, raw_var, raw_pos),
+    )
+
+
+def get_solve(var: str, expr: str) -> str:
+    """Solves an equation.
+
+    Args:
+        var: Variable to solve.
+        expr: Expression to solve.
+
+    Returns:
+        The prettified result.
+    """
+    raw_var = parse_raw(var)
+    raw_expr = parse_raw(expr)
+    return pretty_eq(
+        sympy.ConditionSet(raw_var, sympy.Eq(raw_expr, 0, evaluate=False)),
+        sympy.solveset(raw_expr, raw_var),
+    )
+
+
+def get_ineq(var: str, expr: str) -> str:
+    """Solves an inequality.
+
+    Args:
+        var: Variable to solve.
+        expr: Expression to solve.
+
+    Returns:
+        The prettified result.
+    """
+    raw_var = parse_raw(var)
+    raw_expr = parse_raw(expr)
+    return pretty_eq(
+        sympy.ConditionSet(raw_var, raw_expr, sympy.S.Reals),
+        sympy.solveset(raw_expr, raw_var, sympy.S.Reals),
+    )
+
+
+def get_roots(var: str, expr: str, five: bool) -> typing.List[str]:
+    """Finds the roots of a polynomial.
+
+    Args:
+        var: Variable to solve.
+        expr: Expression to solve.
+        five: Whether to solve quintics.
+
+    Returns:
+        The prettified roots.
+    """
+    raw_var = parse_raw(var)
+    raw_expr = parse_raw(expr)
+    roots = sympy.roots(raw_expr, raw_var, multiple=True, quintics=five)
+    return [sympy.pretty(root, use_unicode=False) for root in roots]
+
+
+def get_dsolv(var: str, expr: str) -> str:
+    """Solves a differential equation.
+
+    Args:
+        var: Function to solve.
+        expr: Expression to solve.
+
+    Returns:
+        The prettified solution.
+    """
+    raw_var = parse_raw(var)
+    raw_expr = sympy.parse_expr(
+        expr.strip("`").replace("\\", ""), local_dict={"D": sympy.Derivative}
+    )
+    return sympy.pretty(sympy.dsolve(raw_expr, raw_var), use_unicode=False)
+
+
+@functools.lru_cache(maxsize=256)
+def get_lambda(
+    var: str, expr: str
+) -> typing.Callable[[numpy.ndarray], typing.Any]:
+    """Compiles an expression to a vectorized function.
+
+    Compiled functions are cached in each worker.
+
+    Args:
+        var: Variable of the function.
+        expr: Expression to compile.
+
+    Returns:
+        The function on NumPy arrays.
+    """
+    return sympy.lambdify(parse_raw(var), parse_raw(expr), "numpy")
+
+
+def get_values(
+    func: typing.Callable[[numpy.ndarray], typing.Any], xs: numpy.ndarray
+) -> numpy.ndarray:
+    """Evaluates a compiled function on an array.
+
+    Args:
+        func: Function to evaluate.
+        xs: Values of the variable.
+
+    Returns:
+        The real values of the function, NaN where it is undefined or
+        complex.
+    """
+    with numpy.errstate(all="ignore"):
+        values = numpy.broadcast_to(numpy.asarray(func(xs)), xs.shape)
+        return numpy.where(
+            numpy.imag(values) == 0, numpy.real(values), numpy.nan
+        ).astype(float)
+
+
+def get_grid(
+    var: str, low: str, high: str, expr: str, size: int
+) -> typing.Tuple[numpy.ndarray, numpy.ndarray]:
+    """Evaluates an expression on an evenly spaced grid.
+
+    Args:
+        var: Variable of the expression.
+        low: Lower bound of the grid.
+        high: Upper bound of the grid.
+        expr: Expression to evaluate.
+        size: Number of points of the grid.
+
+    Returns:
+        The points of the grid and the values on them.
+    """
+    xs = numpy.linspace(
+        float(parse_raw(low)), float(parse_raw(high)), max(size, 2)
+    )
+    return xs, get_values(get_lambda(var, expr), xs)
+
+
+def get_table(var: str, low: str, high: str, expr: str, size: int) -> str:
+    """Tabulates an expression numerically.
+
+    Args:
+        var: Variable of the expression.
+        low: Lower bound of the table.
+        high: Upper bound of the table.
+        expr: Expression to tabulate.
+        size: Number of rows of the table.
+
+    Returns:
+        The formatted table.
+    """
+    xs, ys = get_grid(var, low, high, expr, size)
+    rows = "\n".join(f"{x:>16.8g}{y:>24.15g}" for (x, y) in zip(xs, ys))
+    return f"```{var.strip('`'):>16}{'value':>24}\n{rows}```"
+
+
+def get_zeros(
+    var: str, low: str, high: str, expr: str, size: int
+) -> typing.List[float]:
+    """Finds the real zeros of an expression numerically.
+
+    Sign changes on the grid are refined by bisection on all brackets at
+    once. Brackets with an endpoint that is not finite, or whose values grow
+    while they are bisected, are around poles and are discarded.
+
+    Args:
+        var: Variable of the expression.
+        low: Lower bound of the search.
+        high: Upper bound of the search.
+        expr: Expression to solve.
+        size: Number of points of the grid.
+
+    Returns:
+        The zeros in increasing order.
+    """
+    func = get_lambda(var, expr)
+    xs, ys = get_grid(var, low, high, expr, size)
+    finite = numpy.isfinite(ys)
+    exact = xs[ys == 0]
+    found = numpy.flatnonzero((ys[:-1] * ys[1:] < 0) & finite[:-1] & finite[1:])
+    left, right, sign = xs[found], xs[found + 1], numpy.sign(ys[found])
+    near, far = numpy.abs(ys[found]), numpy.abs(ys[found + 1])
+    grown = numpy.zeros(len(found), dtype=bool)
+    for _ in range(64):
+        mid = (left + right) / 2
+        values = get_values(func, mid)
+        with numpy.errstate(invalid="ignore"):
+            grown |= ~(numpy.abs(values) <= numpy.maximum(near, far))
+        same = numpy.sign(values) == sign
+        left = numpy.where(same, mid, left)
+        right = numpy.where(same, right, mid)
+        near = numpy.where(same, numpy.abs(values), near)
+        far = numpy.where(same, far, numpy.abs(values))
+    mid = (left + right) / 2
+    scale = numpy.max(numpy.abs(ys[finite]), initial=1.0)
+    with numpy.errstate(invalid="ignore"):
+        keep = ~grown & (numpy.abs(get_values(func, mid)) <= 1e-6 * scale)
+    return sorted(float(x) for x in numpy.concatenate([exact, mid[keep]]))
+
+
+def get_integ(
+    var: str, low: str, high: str, expr: str, size: int
+) -> typing.Tuple[float, float]:
+    """Integrates an expression numerically by Simpson's rule.
+
+    Args:
+        var: Variable of integration.
+        low: Lower bound of integration.
+        high: Upper bound of integration.
+        expr: Expression to integrate.
+        size: Number of points of the grid.
+
+    Returns:
+        The integral and an estimate of its error, NaN if the integral
+        does not converge on the grid.
+    """
+    xs, ys = get_grid(var, low, high, expr, size // 4 * 4 + 1)
+
+    def simpson(step: int) -> float:
+        part = ys[::step]
+        width = (xs[-1] - xs[0]) / (len(part) - 1)
+        return float(
+            width
+            / 3
+            * (
+                part[0]
+                + part[-1]
+                + 4 * part[1:-1:2].sum()
+                + 2 * part[2:-1:2].sum()
+            )
+        )
+
+    fine, coarse = simpson(1), simpson(2)
+    return fine, abs(fine - coarse) / 15
+
+
+def get_plot(var: str, low: str, high: str, expr: str, size: int) -> bytes:
+    """Plots an expression.
+
+    The vertical range leaves out the most extreme values, so poles do not
+    flatten the rest of the curve.
+
+    Args:
+        var: Variable of the expression.
+        low: Lower bound of the plot.
+        high: Upper bound of the plot.
+        expr: Expression to plot.
+        size: Number of points of the curve.
+
+    Returns:
+        The PNG of the plot.
+
+    Raises:
+        ValueError: The range of the plot is empty.
+    """
+    xs, ys = get_grid(var, low, high, expr, size)
+    if xs[0] == xs[-1]:
+        raise ValueError("The range of the plot is empty.")
+    finite = ys[numpy.isfinite(ys)]
+    bottom, top = (
+        numpy.percentile(finite, [1, 99]) if len(finite) else (-1.0, 1.0)
+    )
+    if top - bottom < 1e-12:
+        bottom, top = bottom - 1, top + 1
+    bottom, top = bottom - (top - bottom) / 20, top + (top - bottom) / 20
+    cols = 40 + (xs - xs[0]) / (xs[-1] - xs[0]) * 560
+    rows = 20 + (top - ys) / (top - bottom) * 360
+    shown = numpy.isfinite(rows) & (rows > -1000) & (rows < 1400)
+    path = "".join(
+        f"{'L' if index and shown[index - 1] else 'M'}"
+        f"{cols[index]:.1f},{rows[index]:.1f}"
+        for index in numpy.flatnonzero(shown)
+    )
+    axes = ""
+    if xs[0] <= 0 <= xs[-1]:
+        col = 40 - xs[0] / (xs[-1] - xs[0]) * 560
+        axes += f'<path d="M{col:.1f},20V380" stroke="#999"/>'
+    if bottom <= 0 <= top:
+        row = 20 + top / (top - bottom) * 360
+        axes += f'<path d="M40,{row:.1f}H600" stroke="#999"/>'
+    image = (
+        '<svg xmlns="http://www.w3.org/2000/svg" width="640" height="420"'
+        ' font-family="sans-serif" font-size="12"><defs><clipPath id="c">'
+        '<rect x="40" y="20" width="560" height="360"/></clipPath></defs>'
+        '<rect width="640" height="420" fill="white"/>'
+        '<rect x="40" y="20" width="560" height="360" fill="none"'
+        f' stroke="#333"/>{axes}<path d="{path}" fill="none"'
+        ' stroke="#1f77b4" stroke-width="1.5" clip-path="url(#c)"/>'
+        f'<text x="40" y="400">{xs[0]:.6g}</text>'
+        f'<text x="600" y="400" text-anchor="end">{xs[-1]:.6g}</text>'
+        f'<text x="36" y="32" text-anchor="end">{top:.4g}</text>'
+        f'<text x="36" y="380" text-anchor="end">{bottom:.4g}</text></svg>'
+    )
+    return cairosvg.svg2png(image.encode())
+
+
+def get_evalf(expr: str) -> str:
+    """Approximates an expression numerically.
+
+    Args:
+        expr: Expression to approximate.
+
+    Returns:
+        The prettified result.
+    """
+    raw_expr = parse_raw(expr)
+    return "Numeric approximation:" + pretty_eq(raw_expr, raw_expr.evalf())
+
+
+def get_nroots(var: str, expr: str, five: bool) -> typing.List[str]:
+    """Approximates the roots of a polynomial numerically.
+
+    Args:
+        var: Variable to solve.
+        expr: Expression to solve.
+        five: Unused, accepted to match get_roots.
+
+    Returns:
+        The prettified roots.
+    """
+    del five
+    raw_var = parse_raw(var)
+    raw_expr = parse_raw(expr)
+    roots = sympy.Poly(raw_expr, raw_var).nroots()
+    return [sympy.pretty(root, use_unicode=False) for root in roots]
+
+
+DEGRADE = {
+    "get_simpl": get_evalf,
+    "get_expn": get_evalf,
+    "get_fact": get_evalf,
+    "get_apart": get_evalf,
+    "get_roots": get_nroots,
+}
+
+
+class Cost(typing.NamedTuple):
+    """Measurements of an expression tree.
+
+    Attributes:
+        nodes: Number of nodes.
+        depth: Depth of the tree.
+        degree: Estimated total degree as a polynomial.
+        power: Estimated largest numeric exponent.
+        digits: Estimated largest number of digits of a numeric subtree.
+    """
+
+    nodes: int
+    depth: int
+    degree: float
+    power: float
+    digits: float
+
+
+def get_exp(node: sympy.Basic, mags: typing.Dict[sympy.Basic, float]) -> float:
+    """Estimates the numeric exponent of a power.
+
+    Args:
+        node: Node of the expression tree.
+        mags: Logarithms of the magnitudes of numeric subtrees.
+
+    Returns:
+        The absolute value of the exponent, 0 if not a numeric power.
+    """
+    if not node.is_Pow or node.exp not in mags:
+        return 0.0
+    if node.exp.is_Integer:
+        return float(min(abs(int(node.exp)), 1 << 1000))
+    return 10 ** min(mags[node.exp], 300.0)
+
+
+def get_mag(
+    node: sympy.Basic, mags: typing.Dict[sympy.Basic, float], exp: float
+) -> float:
+    """Estimates the logarithm of the magnitude of a numeric node.
+
+    Args:
+        node: Node of the expression tree.
+        mags: Logarithms of the magnitudes of numeric subtrees.
+        exp: Numeric exponent of the node.
+
+    Returns:
+        The logarithm of the magnitude in base 10.
+    """
+    args = [mags[arg] for arg in node.args]
+    if node.is_Rational:
+        return math.log10(max(abs(node.p), node.q, 1))
+    if node.is_Pow:
+        return args[0] * max(exp, 1.0)
+    if node.is_Add:
+        return max(args) + 0.30103
+    if node.is_Mul:
+        return sum(args)
+    return 0.0
+
+
+def measure(expr: sympy.Basic) -> Cost:
+    """Measures an expression tree without evaluating it.
+
+    Numeric subtrees are measured by the logarithm of their magnitude, so
+    unevaluated towers such as ``2**10**100`` are measured safely.
+
+    Args:
+        expr: Expression to measure.
+
+    Returns:
+        The measurements of the expression.
+    """
+    nodes = depth = 0
+    power = digits = 0.0
+    mags: typing.Dict[sympy.Basic, float] = {}
+    degrees: typing.Dict[sympy.Basic, float] = {}
+    stack = [(expr, 1, False)]
+    while stack:
+        node, level, done = stack.pop()
+        if not done:
+            nodes += 1
+            depth = max(depth, level)
+            stack.append((node, level, True))
+            stack.extend((arg, level + 1, False) for arg in node.args)
+            continue
+        exp = get_exp(node, mags)
+        power = max(power, exp)
+        if (
+            node.is_Number
+            or node.is_NumberSymbol
+            or (node.args and all(arg in mags for arg in node.args))
+        ):
+            mags[node] = get_mag(node, mags, exp)
+            digits = max(digits, mags[node])
+        if node.is_Symbol:
+            degrees[node] = 1.0
+        elif node.is_Pow:
+            degrees[node] = degrees[node.base] * max(exp, 1.0)
+        elif node.is_Mul:
+            degrees[node] = sum(degrees[arg] for arg in node.args)
+        else:
+            degrees[node] = max(
+                (degrees[arg] for arg in node.args), default=0.0
+            )
+    return Cost(nodes, depth, degrees[expr], power, digits)
+
+
+def get_plan(
+    name: str,
+    caps: typing.Dict[str, float],
+    cost: typing.Dict[str, float],
+    *args,
+) -> typing.Tuple[str, str]:
+    """Canonicalizes a calculation and predicts its cost.
+
+    The cost is the weight of the calculation times the number of nodes
+    times the square of one plus the degree. Calculations over the caps are
+    degraded to a numeric approximation if possible and rejected otherwise.
+    Degraded calculations and calculations over the fast limit go to the
+    slow queue.
+
+    Args:
+        name: Name of the calculation.
+        caps: Caps of the measurements and limits of the cost.
+        cost: Weights of calculations.
+        args: Arguments of the calculation.
+
+    Returns:
+        The key of the calculation and its plan, which is one of "fast",
+        "slow", "degrade" and "reject".
+    """
+    costs = [measure(parse_raw(arg)) for arg in args if isinstance(arg, str)]
+    total = Cost(
+        sum(item.nodes for item in costs),
+        *(
+            max((getattr(item, field) for item in costs), default=0)
+            for field in ("depth", "degree", "power", "digits")
+        ),
+    )
+    score = cost.get(name, 1) * total.nodes * (1 + min(total.degree, 1e9)) ** 2
+    if score > caps["slow"] or any(
+        getattr(total, field) > caps[field] for field in Cost._fields
+    ):
+        plan = "degrade" if name in DEGRADE else "reject"
+    elif score > caps["fast"]:
+        plan = "slow"
+    else:
+        plan = "fast"
+    return get_key(name, *args), plan
+
+
+def get_key(name: str, *args) -> str:
+    """Canonicalizes a calculation for the result cache.
+
+    Args:
+        name: Name of the calculation.
+        args: Arguments of the calculation.
+
+    Returns:
+        The key of the calculation.
+    """
+    return repr(
+        (name,)
+        + tuple(
+            sympy.srepr(parse_raw(arg)) if isinstance(arg, str) else arg
+            for arg in args
+        )
+    )
+
+
 class CalcCog(commands.Cog, name="Mathematics"):
     """Mathematical commands.
 
     Attributes:
         bot: The bot that contains the cog.
+        pool: Pool of workers to run calculations.
+        slow: Pool of workers to run expensive calculations.
+        keys: Keys of the result cache and plans by the text of
+            calculations.
+        results: Results of calculations by their keys.
+        plots: Rendered plots by their keys, kept in memory only.
     """
 
     def __init__(self, bot: base.Bot):
@@ -58,6 +676,85 @@ class CalcCog(commands.Cog, name="Mathematics"):
             bot: The bot that contains the cog.
         """
         self.bot = bot
+        self.pool = pool.WorkerPool(
+            bot.cfg.cogs.calc.pool,
+            bot.cfg.cogs.calc.time,
+            bot.cfg.cogs.calc.mem,
+            preload=["sympy", "numpy", __name__],
+        )
+        self.slow = pool.WorkerPool(
+            bot.cfg.cogs.calc.slow,
+            bot.cfg.cogs.calc.wait,
+            bot.cfg.cogs.calc.mem,
+            preload=["sympy", "numpy", __name__],
+        )
+        self.keys = cache.Cache(bot.cfg.cogs.calc.size)
+        self.results = cache.Cache(
+            bot.cfg.cogs.calc.size, path=bot.cfg.cogs.calc.file
+        )
+        self.plots = cache.Cache(
+            bot.cfg.cogs.calc.size,
+            budget=bot.cfg.cogs.calc.imgs << 20,
+            weigh_=len,
+        )
+
+    @commands.Cog.listener()
+    async def on_config_reload(self, old: conf.Config, new: conf.Config):
+        """Forgets the plans made with the previous caps and costs.
+
+        Args:
+            old: Previous configuration.
+            new: Reloaded configuration.
+        """
+        keys = operator.attrgetter("caps", "cost")
+        if keys(old.cogs.calc) != keys(new.cogs.calc):
+            self.keys.clear()
+
+    async def compute(
+        self,
+        func: typing.Callable[..., typing.Any],
+        *args,
+        store: typing.Optional[cache.Cache] = None,
+    ) -> typing.Any:
+        """Runs a calculation through the result cache.
+
+        Args:
+            func: Calculation to run.
+            args: Arguments of the calculation.
+            store: Cache of the results, the result cache if omitted.
+
+        Returns:
+            The result of the calculation.
+        """
+        text = repr(
+            (func.__name__,)
+            + tuple(
+                " ".join(arg.strip("`").split())
+                if isinstance(arg, str)
+                else arg
+                for arg in args
+            )
+        )
+        cfg = self.bot.cfg.cogs.calc
+        plan = self.keys.get(text)
+        if plan is None:
+            plan = await self.pool.run(
+                get_plan, func.__name__, dict(cfg.caps), dict(cfg.cost), *args
+            )
+            self.keys.put(text, plan)
+        key, verdict = plan
+        if verdict == "reject":
+            raise commands.BadArgument("The expression is too complex.")
+        if verdict == "degrade":
+            func = DEGRADE[func.__name__]
+            key = repr((func.__name__, key))
+        store = self.results if store is None else store
+        result = store.get(key)
+        if result is None:
+            workers = self.pool if verdict == "fast" else self.slow
+            result = await workers.run(func, *args)
+            store.put(key, result)
+        return result
 
     @commands.hybrid_group(fallback="simpl")
     async def simpl(self, ctx: commands.Context[base.Bot], *, expr: str):
@@ -67,11 +764,7 @@ class CalcCog(commands.Cog, name="Mathematics"):
             ctx: Context of the command.
             expr: Expression to simplify.
         """
-        raw_expr = parse_raw(expr)
-        await ctx.send(
-            pretty_eq(raw_expr, sympy.simplify(raw_expr, ratio=sympy.oo)),
-            ephemeral=True,
-        )
+        await page.send(ctx, [await self.compute(get_simpl, expr)])
 
     @simpl.command()
     async def expn(self, ctx: commands.Context[base.Bot], *, expr: str):
@@ -81,10 +774,7 @@ class CalcCog(commands.Cog, name="Mathematics"):
             ctx: Context of the command.
             expr: Expression to expand.
         """
-        raw_expr = parse_raw(expr)
-        await ctx.send(
-            pretty_eq(raw_expr, sympy.expand(raw_expr)), ephemeral=True
-        )
+        await page.send(ctx, [await self.compute(get_expn, expr)])
 
     @simpl.command()
     async def fact(self, ctx: commands.Context[base.Bot], *, expr: str):
@@ -94,10 +784,7 @@ class CalcCog(commands.Cog, name="Mathematics"):
             ctx: Context of the command.
             expr: Expression to factor.
         """
-        raw_expr = parse_raw(expr)
-        await ctx.send(
-            pretty_eq(raw_expr, sympy.factor(raw_expr)), ephemeral=True
-        )
+        await page.send(ctx, [await self.compute(get_fact, expr)])
 
     @simpl.command()
     async def apart(self, ctx: commands.Context[base.Bot], *, expr: str):
@@ -107,10 +794,7 @@ class CalcCog(commands.Cog, name="Mathematics"):
             ctx: Context of the command.
             expr: Expression to decompose.
         """
-        raw_expr = parse_raw(expr)
-        await ctx.send(
-            pretty_eq(raw_expr, sympy.apart(raw_expr)), ephemeral=True
-        )
+        await page.send(ctx, [await self.compute(get_apart, expr)])
 
     @commands.hybrid_group()
     async def calc(self, ctx: commands.Context[base.Bot], cmd: str):
@@ -133,15 +817,7 @@ class CalcCog(commands.Cog, name="Mathematics"):
             var: Variable to calculate derivatives.
             expr: Expression to calculate derivatives.
         """
-        raw_var = parse_raw(var)
-        raw_expr = parse_raw(expr)
-        await ctx.send(
-            pretty_eq(
-                sympy.Derivative(raw_expr, raw_var),
-                sympy.diff(raw_expr, raw_var),
-            ),
-            ephemeral=True,
-        )
+        await page.send(ctx, [await self.compute(get_diff, var, expr)])
 
     @calc.command()
     async def adiff(
@@ -154,15 +830,7 @@ class CalcCog(commands.Cog, name="Mathematics"):
             var: Variable to calculate integrals.
             expr: Expression to calculate integrals.
         """
-        raw_var = parse_raw(var)
-        raw_expr = parse_raw(expr)
-        await ctx.send(
-            pretty_eq(
-                sympy.Integral(raw_expr, raw_var),
-                sympy.integrate(raw_expr, raw_var),
-            ),
-            ephemeral=True,
-        )
+        await page.send(ctx, [await self.compute(get_adiff, var, expr)])
 
     @calc.command()
     async def limit(
@@ -181,16 +849,7 @@ class CalcCog(commands.Cog, name="Mathematics"):
             var: Variable to calculate limits.
             expr: Expression to calculate limits.
         """
-        raw_var = parse_raw(var)
-        raw_pos = parse_raw(pos)
-        raw_expr = parse_raw(expr)
-        await ctx.send(
-            pretty_eq(
-                sympy.Limit(raw_expr, raw_var, raw_pos),
-                sympy.limit(raw_expr, raw_var, raw_pos),
-            ),
-            ephemeral=True,
-        )
+        await page.send(ctx, [await self.compute(get_limit, pos, var, expr)])
 
     @commands.hybrid_group(fallback="solve")
     async def solve(
@@ -203,17 +862,7 @@ class CalcCog(commands.Cog, name="Mathematics"):
             var: Variable to solve.
             expr: Expression to solve.
         """
-        raw_var = parse_raw(var)
-        raw_expr = parse_raw(expr)
-        await ctx.send(
-            pretty_eq(
-                sympy.ConditionSet(
-                    raw_var, sympy.Eq(raw_expr, 0, evaluate=False)
-                ),
-                sympy.solveset(raw_expr, raw_var),
-            ),
-            ephemeral=True,
-        )
+        await page.send(ctx, [await self.compute(get_solve, var, expr)])
 
     @solve.command()
     async def ineq(
@@ -226,15 +875,7 @@ class CalcCog(commands.Cog, name="Mathematics"):
             var: Variable to solve.
             expr: Expression to solve.
         """
-        raw_var = parse_raw(var)
-        raw_expr = parse_raw(expr)
-        await ctx.send(
-            pretty_eq(
-                sympy.ConditionSet(raw_var, raw_expr, sympy.S.Reals),
-                sympy.solveset(raw_expr, raw_var, sympy.S.Reals),
-            ),
-            ephemeral=True,
-        )
+        await page.send(ctx, [await self.compute(get_ineq, var, expr)])
 
     @solve.command()
     async def roots(
@@ -247,28 +888,10 @@ class CalcCog(commands.Cog, name="Mathematics"):
             var: Variable to solve.
             expr: Expression to solve.
         """
-        raw_var = parse_raw(var)
-        raw_expr = parse_raw(expr)
-        res_var = var.strip("`").replace("\\", "")
-        res_expr = expr.strip("`").replace("\\", "")
-        roots = sympy.roots(
-            raw_expr,
-            raw_var,
-            multiple=True,
-            quintics=self.bot.cfg["feynmanium"]["cogs"]["calc"]["five"],
+        results = await self.compute(
+            get_roots, var, expr, self.bot.cfg.cogs.calc.five
         )
-        if len(roots) == 0:
-            await ctx.send(
-                f"Solving for `{res_var}` in `{res_expr}` failed.",
-                ephemeral=True,
-            )
-            return
-        await ctx.send(
-            f"Solving for `{res_var}` in `{res_expr}` gives:", ephemeral=True
-        )
-        for root in roots:
-            result = sympy.pretty(root, use_unicode=False)
-            await ctx.send(f"```{result}```", ephemeral=True)
+        await page.send(ctx, [f"```{result}```" for result in results])
 
     @solve.command()
     async def dsolv(
@@ -281,19 +904,156 @@ class CalcCog(commands.Cog, name="Mathematics"):
             var: Function to solve.
             expr: Expression to solve.
         """
-        raw_var = parse_raw(var)
-        raw_expr = sympy.parse_expr(
-            expr.strip("`").replace("\\", ""),
-            local_dict={"D": sympy.Derivative},
-        )
         res_var = var.strip("`").replace("\\", "")
         res_expr = expr.strip("`").replace("\\", "")
-        result = sympy.pretty(
-            sympy.dsolve(raw_expr, raw_var), use_unicode=False
+        result = await self.compute(get_dsolv, var, expr)
+        await page.send(
+            ctx,
+            [
+                f"Solving for `{res_var}` in `{res_expr}` gives:",
+                f"```{result}```",
+            ],
+        )
+
+    @commands.hybrid_group(fallback="table")
+    async def num(
+        self,
+        ctx: commands.Context[base.Bot],
+        low: str,
+        high: str,
+        var: str = "x",
+        *,
+        expr: str,
+    ):
+        """Tabulates expressions numerically.
+
+        Args:
+            ctx: Context of the command.
+            low: Lower bound of the table.
+            high: Upper bound of the table.
+            var: Variable of the expression.
+            expr: Expression to tabulate.
+        """
+        await page.send(
+            ctx,
+            [
+                await self.compute(
+                    get_table, var, low, high, expr, self.bot.cfg.cogs.calc.rows
+                )
+            ],
         )
+
+    @num.command()
+    async def zero(
+        self,
+        ctx: commands.Context[base.Bot],
+        low: str,
+        high: str,
+        var: str = "x",
+        *,
+        expr: str,
+    ):
+        """Finds real zeros numerically.
+
+        Args:
+            ctx: Context of the command.
+            low: Lower bound of the search.
+            high: Upper bound of the search.
+            var: Variable to solve.
+            expr: Expression to solve.
+        """
+        result = await self.compute(
+            get_zeros, var, low, high, expr, self.bot.cfg.cogs.calc.grid
+        )
+        res_expr = expr.strip("`").replace("\\", "")
+        res_zeros = "\n".join(f"{zero:.12g}" for zero in result)
+        await page.send(
+            ctx,
+            [
+                f"Found {len(result)} zeros of `{res_expr}` "
+                f"on [{low}, {high}]:",
+                f"```{res_zeros or 'none'}```",
+            ],
+        )
+
+    @num.command()
+    async def integ(
+        self,
+        ctx: commands.Context[base.Bot],
+        low: str,
+        high: str,
+        var: str = "x",
+        *,
+        expr: str,
+    ):
+        """Calculates definite integrals numerically.
+
+        Args:
+            ctx: Context of the command.
+            low: Lower bound of integration.
+            high: Upper bound of integration.
+            var: Variable of integration.
+            expr: Expression to integrate.
+        """
+        value, error = await self.compute(
+            get_integ, var, low, high, expr, self.bot.cfg.cogs.calc.grid
+        )
+        res_expr = expr.strip("`").replace("\\", "")
+        if not math.isfinite(value):
+            raise commands.BadArgument(
+                f"The integral of `{res_expr}` does not converge."
+            )
+        await page.send(
+            ctx,
+            [
+                f"Integrating `{res_expr}` on [{low}, {high}] gives:",
+                f"```{value:.15g} ± {error:.2g}```",
+            ],
+        )
+
+    @num.command()
+    async def plot(
+        self,
+        ctx: commands.Context[base.Bot],
+        low: str,
+        high: str,
+        var: str = "x",
+        *,
+        expr: str,
+    ):
+        """Plots expressions.
+
+        Args:
+            ctx: Context of the command.
+            low: Lower bound of the plot.
+            high: Upper bound of the plot.
+            var: Variable of the expression.
+            expr: Expression to plot.
+        """
+        image = await self.compute(
+            get_plot,
+            var,
+            low,
+            high,
+            expr,
+            self.bot.cfg.cogs.calc.dots,
+            store=self.plots,
+        )
+        await ctx.send(
+            file=discord.File(io.BytesIO(image), "plot.png"), ephemeral=True
+        )
+
+    @commands.command()
+    @commands.is_owner()
+    async def cache(self, ctx: commands.Context[base.Bot]):
+        """Shows statistics of the result caches.
+
+        Args:
+            ctx: Context of the command.
+        """
         await ctx.send(
-            f"Solving for `{res_var}` in `{res_expr}` gives: ```{result}```",
-            ephemeral=True,
+            f"Result cache: {self.results.stat()}\n"
+            f"Plot cache: {self.plots.stat()}"
         )
 
 
@@ -312,4 +1072,9 @@ async def teardown(bot: base.Bot):
     Args:
         bot: Bot that unloads the extension.
     """
+    cog = bot.get_cog("Mathematics")
+    if isinstance(cog, CalcCog):
+        await cog.pool.close()
+        await cog.slow.close()
+        cog.results.close()
     await bot.remove_cog("Mathematics", guilds=list(bot.glds))
@@ -12,128 +12,1092 @@ PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
 You should have received a copy of the GNU Affero General Public License along
 with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
 """
+import array
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
 import datetime
+import functools
 import io
+import operator
 import secrets
+import sqlite3
+import sys
+import tempfile
+import textwrap
+import time
 import typing
+import weakref
 
+import aiohttp
 import cairosvg
 import chess
 import discord
-from chess import engine, pgn, svg
-from discord import ui
-from discord.ext import commands
+from chess import engine, pgn, polyglot, svg, syzygy
+from discord import app_commands, ui
+from discord.ext import commands, tasks
 
-from .. import base
+from .. import base, cache, conf, metric, pool
 
 
-async def get_move(path: str, board: chess.Board, level: int) -> chess.Move:
+class Book:
+    """Opening book and endgame tablebases that answer before stockfish.
+
+    Attributes:
+        book: Memory-mapped Polyglot book, None if not configured.
+        tbs: Syzygy tablebases, None if not configured.
+        plies: Number of plies to look up in the book.
+        men: Largest number of pieces to probe in the tablebases.
+        least: Lowest skill level that plays tablebase moves.
+        hits: Number of moves found by source.
+        pool: Thread that looks up positions.
+    """
+
+    def __init__(self, book: str, tbs: str, plies: int, men: int, least: int):
+        """Opens the book and the tablebases.
+
+        Args:
+            book: Path of the Polyglot book, empty to disable.
+            tbs: Directory of the Syzygy tablebases, empty to disable.
+            plies: Number of plies to look up in the book.
+            men: Largest number of pieces to probe in the tablebases.
+            least: Lowest skill level that plays tablebase moves.
+        """
+        self.book = polyglot.open_reader(book) if book else None
+        self.tbs = syzygy.open_tablebase(tbs) if tbs else None
+        self.plies, self.men, self.least = plies, men, least
+        self.hits: typing.Counter[str] = collections.Counter()
+        self.pool = concurrent.futures.ThreadPoolExecutor(1)
+
+    def pick(
+        self, board: chess.Board, level: int
+    ) -> typing.Optional[chess.Move]:
+        """Picks a book move, preferring popular moves at higher levels.
+
+        Args:
+            board: Position to look up.
+            level: Skill level of stockfish.
+
+        Returns:
+            The book move, None if the position is not in the book.
+        """
+        if self.book is None or board.ply() >= self.plies:
+            return None
+        entries = list(self.book.find_all(board))
+        if not entries:
+            return None
+        weights = [max(entry.weight, 1) ** (level / 10) for entry in entries]
+        return secrets.SystemRandom().choices(entries, weights)[0].move
+
+    def probe(
+        self, board: chess.Board, level: int
+    ) -> typing.Optional[chess.Move]:
+        """Picks the best move by the tablebases.
+
+        Wins are converted as fast as possible and losses are delayed as
+        long as possible.
+
+        Args:
+            board: Position to probe.
+            level: Skill level of stockfish.
+
+        Returns:
+            The best move, None if the position is not in the tablebases.
+        """
+        if (
+            self.tbs is None
+            or level < self.least
+            or chess.popcount(board.occupied) > self.men
+        ):
+            return None
+        best, best_key = None, (3, 0)
+        try:
+            for move in board.legal_moves:
+                board.push(move)
+                try:
+                    key = (
+                        self.tbs.probe_wdl(board),
+                        -self.tbs.probe_dtz(board),
+                    )
+                finally:
+                    board.pop()
+                if key < best_key:
+                    best, best_key = move, key
+        except KeyError:
+            return None
+        return best
+
+    async def play(
+        self, board: chess.Board, level: int
+    ) -> typing.Optional[engine.PlayResult]:
+        """Answers a position without stockfish if possible.
+
+        Lookups run in the thread of the book, so probes of the tablebases
+        never block the event loop.
+
+        Args:
+            board: Position to play.
+            level: Skill level of stockfish.
+
+        Returns:
+            The move of the book or the tablebases, None if neither knows
+            the position.
+        """
+        board = board.copy(stack=False)
+        for name, find in (("book", self.pick), ("tbs", self.probe)):
+            move = await asyncio.get_running_loop().run_in_executor(
+                self.pool, find, board, level
+            )
+            if move is not None:
+                self.hits[name] += 1
+                return engine.PlayResult(move, None)
+        self.hits["engine"] += 1
+        return None
+
+    def stat(self) -> str:
+        """Summarizes the sources of moves.
+
+        Returns:
+            The summary of the sources.
+        """
+        return (
+            f"{self.hits['book']} book moves, {self.hits['tbs']} tablebase "
+            f"moves, {self.hits['engine']} engine moves"
+        )
+
+    def close(self):
+        """Stops the thread and closes the book and the tablebases."""
+        self.pool.shutdown()
+        if self.book is not None:
+            self.book.close()
+        if self.tbs is not None:
+            self.tbs.close()
+
+
+async def get_play(
+    engines: pool.EnginePool,
+    board: chess.Board,
+    level: int,
+    game: object = None,
+    book: typing.Optional[Book] = None,
+    limit: typing.Optional[engine.Limit] = None,
+) -> engine.PlayResult:
+    """Plays a position using the book, the tablebases or stockfish.
+
+    Args:
+        engines: Pool of stockfish engines.
+        board: Position to play.
+        level: Skill level of stockfish.
+        game: Key of the game.
+        book: Book and tablebases to try first, None to use stockfish only.
+        limit: Search limit of stockfish, depth 16 if omitted.
+
+    Returns:
+        The result of stockfish, including its expected reply.
+    """
+    if book is not None:
+        result = await book.play(board, level)
+        if result is not None:
+            return result
+    return await engines.play(
+        board,
+        limit or engine.Limit(depth=16),
+        game=game,
+        options={"Skill Level": level - 1},
+    )
+
+
+async def get_move(
+    engines: pool.EnginePool,
+    board: chess.Board,
+    level: int,
+    game: object = None,
+) -> chess.Move:
     """Plays a position using stockfish.
 
     Args:
-        path: Path of the stockfish executable.
+        engines: Pool of stockfish engines.
         board: Position to play.
         level: Skill level of stockfish.
+        game: Key of the game.
 
     Returns:
         The move stockfish plays.
     """
-    _, api = await engine.popen_uci(path)
-    result = await api.play(
-        board, engine.Limit(depth=16), options={"Skill Level": level - 1}
-    )
-    await api.quit()
+    result = await get_play(engines, board, level, game)
     if result.move is not None:
         return result.move
     return chess.Move.null()
 
 
-def get_svg(board: chess.Board, color: chess.Color) -> typing.Any:
-    """Renders the SVG of the board.
+def draw(image: str) -> typing.Tuple[float, bytes]:
+    """Converts an SVG to a PNG in a thread.
 
     Args:
-        board: Chessboard to render.
-        color: Point of view.
+        image: SVG to convert.
 
     Returns:
-        The rendered SVG.
+        The time the conversion started and the PNG.
     """
-    result = svg.board(
-        board,
-        orientation=color,
-        lastmove=(None if len(board.move_stack) == 0 else board.peek()),
-        check=(board.king(board.turn) if board.is_check() else None),
+    return time.perf_counter(), cairosvg.svg2png(image)
+
+
+class Renderer:
+    """Renderer of boards with a cache of PNGs.
+
+    Attributes:
+        cache: Rendered PNGs by the state of the board.
+        jobs: Renders in progress by the state of the board.
+        bg: Background renders to keep alive.
+    """
+
+    def __init__(self, budget: int):
+        """Initializes the renderer.
+
+        Args:
+            budget: Maximum total size of cached PNGs in bytes.
+        """
+        self.cache = cache.Cache(budget=budget, weigh_=len)
+        self.jobs: typing.Dict[str, asyncio.Future] = {}
+        self.bg: typing.Set[asyncio.Task] = set()
+
+    async def render(self, board: chess.Board, color: chess.Color) -> bytes:
+        """Renders the PNG of the board without blocking the event loop.
+
+        Args:
+            board: Chessboard to render.
+            color: Point of view.
+
+        Returns:
+            The rendered PNG.
+        """
+        lastmove = None if len(board.move_stack) == 0 else board.peek()
+        check = board.king(board.turn) if board.is_check() else None
+        key = f"{board.board_fen()} {color} {lastmove} {check}"
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+        if key not in self.jobs:
+            image = svg.board(
+                board, orientation=color, lastmove=lastmove, check=check
+            )
+            job = asyncio.get_running_loop().run_in_executor(None, draw, image)
+            job.add_done_callback(functools.partial(self.done, key))
+            self.jobs[key] = job
+        arrive = time.perf_counter()
+        start, result = await asyncio.shield(self.jobs[key])
+        start = max(start, arrive)
+        metric.add("wait", start - arrive)
+        metric.add("compute", time.perf_counter() - start)
+        return result
+
+    def done(self, key: str, job: asyncio.Future):
+        """Caches the PNG of a finished render.
+
+        Args:
+            key: State of the board.
+            job: Finished render.
+        """
+        del self.jobs[key]
+        if not job.cancelled() and job.exception() is None:
+            self.cache.put(key, job.result()[1])
+
+    def prefetch(self, board: chess.Board, color: chess.Color):
+        """Renders the board in the background.
+
+        Args:
+            board: Chessboard to render.
+            color: Point of view.
+        """
+        task = asyncio.create_task(self.render(board, color))
+        self.bg.add(task)
+        task.add_done_callback(self.bg.discard)
+
+
+class Analysis(typing.NamedTuple):
+    """Analysis of a position.
+
+    Attributes:
+        depth: Depth of the search.
+        score: Score from the point of view of white.
+        wdl: Expected results from the point of view of white, None if the
+            engine did not report them.
+        pv: Principal variation.
+    """
+
+    depth: int
+    score: engine.Score
+    wdl: typing.Optional[engine.Wdl]
+    pv: typing.List[chess.Move]
+
+
+def get_analysis(info: engine.InfoDict) -> Analysis:
+    """Extracts the analysis from the information of stockfish.
+
+    Args:
+        info: Information of stockfish.
+
+    Returns:
+        The analysis of the position.
+    """
+    return Analysis(
+        info.get("depth", 0),
+        info["score"].white() if "score" in info else engine.Cp(0),
+        info["wdl"].white() if "wdl" in info else None,
+        info.get("pv", []),
+    )
+
+
+def get_score(score: engine.Score) -> str:
+    """Formats a score in pawns or moves to mate.
+
+    Args:
+        score: Score to format.
+
+    Returns:
+        The formatted score.
+    """
+    if score == engine.Mate(0):
+        return "#"
+    if score.is_mate():
+        mate = score.mate()
+        if mate is not None:
+            return "#" + str(mate)
+        return "#-0"
+    return str(round(score.score(mate_score=100) / 100, 2))
+
+
+def get_text(board: chess.Board, info: Analysis) -> str:
+    """Describes the analysis of a position.
+
+    Args:
+        board: Position of the analysis.
+        info: Analysis of the position.
+
+    Returns:
+        The description of the analysis.
+    """
+    wdl = round(info.score.wdl(model="lichess").expectation() * 100, 2)
+    return (
+        f"White has an advantage of {get_score(info.score)} ({wdl}%) at "
+        f"depth {info.depth}.\n> {board.variation_san(info.pv)}"
+    )
+
+
+def get_expect(
+    info: typing.List[engine.InfoDict], color: chess.Color
+) -> typing.Optional[float]:
+    """Gets the expected score of a player from the best line.
+
+    Args:
+        info: Lines of stockfish, best first.
+        color: Player to get the expected score of.
+
+    Returns:
+        The expected score, None if stockfish gave no score.
+    """
+    if "score" not in info[0]:
+        return None
+    return info[0]["score"].pov(color).wdl(model="lichess").expectation()
+
+
+def get_report(
+    boards: typing.List[chess.Board],
+    infos: typing.List[typing.List[engine.InfoDict]],
+    game: bool,
+) -> str:
+    """Reports the analyses of positions.
+
+    In a game, a move that loses at least 15, 10 or 5 percent of the
+    expected score of the player is flagged as a blunder, a mistake or an
+    inaccuracy.
+
+    Args:
+        boards: Positions, each one move after the last in a game.
+        infos: Lines of stockfish for each position, best first.
+        game: Whether the positions are the moves of a game.
+
+    Returns:
+        The report of the analyses.
+    """
+    lines = []
+    for idx, (board, info) in enumerate(zip(boards, infos)):
+        top = ", ".join(
+            f"{board.san(line['pv'][0])} {get_score(line['score'].white())}"
+            for line in info
+            if line.get("pv") and "score" in line
+        )
+        if not game:
+            score = info[0].get("score")
+            result = "?" if score is None else get_score(score.white())
+            lines.append(f"{idx + 1}. {board.fen()} {result} ({top})")
+        elif idx + 1 < len(boards):
+            move = boards[idx + 1].peek()
+            score = infos[idx + 1][0].get("score")
+            result = "?" if score is None else get_score(score.white())
+            before = get_expect(info, board.turn)
+            after = get_expect(infos[idx + 1], board.turn)
+            flag = ""
+            if before is not None and after is not None:
+                for limit, mark in ((0.15, "??"), (0.1, "?"), (0.05, "?!")):
+                    if before - after >= limit:
+                        flag = mark
+                        break
+            dots = "." if board.turn == chess.WHITE else "..."
+            lines.append(
+                f"{board.fullmove_number}{dots} {board.san(move)}{flag} "
+                f"{result} ({top})"
+            )
+    return "\n".join(lines)
+
+
+def get_graph(infos: typing.List[typing.List[engine.InfoDict]]) -> str:
+    """Draws the expected score of white over the positions.
+
+    Args:
+        infos: Lines of stockfish for each position, best first.
+
+    Returns:
+        The SVG of the graph.
+    """
+    width, height = 600, 200
+    step = width / max(len(infos) - 1, 1)
+    points = []
+    for idx, info in enumerate(infos):
+        expect = get_expect(info, chess.WHITE)
+        value = 0.5 if expect is None else expect
+        points.append(f"{idx * step:.1f},{height * (1 - value):.1f}")
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" '
+        f'height="{height}" viewBox="0 0 {width} {height}">'
+        f'<rect width="{width}" height="{height}" fill="#302e2b"/>'
+        f'<polygon points="0,{height} {" ".join(points)} {width},{height}" '
+        'fill="#ffffff"/>'
+        f'<line x1="0" y1="{height / 2}" x2="{width}" y2="{height / 2}" '
+        'stroke="#888888"/>'
+        "</svg>"
+    )
+
+
+class AnalysisStore:
+    """Persistent store of analyses by position.
+
+    Positions are keyed by their EPD, so move clocks are ignored. Requests
+    at or below the stored depth are answered from the store. Deeper
+    searches share one game key, so engines keep their hash tables between
+    analyses instead of starting a new game.
+
+    Attributes:
+        pool: Pool of stockfish engines.
+        cache: Deepest analyses by position.
+        jobs: Analyses in progress by position and search limit.
+        reports: Callbacks of the analyses in progress.
+    """
+
+    def __init__(self, engines: pool.EnginePool, size: int, path: str):
+        """Initializes the store.
+
+        Args:
+            engines: Pool of stockfish engines.
+            size: Maximum number of stored analyses.
+            path: Path of the SQLite store, empty to keep analyses in memory.
+        """
+        self.pool = engines
+        self.cache = cache.Cache(size, path=path)
+        self.jobs: typing.Dict[str, asyncio.Future] = {}
+        self.reports: typing.Dict[
+            str, typing.List[typing.Callable[[Analysis], None]]
+        ] = {}
+
+    def get(self, board: chess.Board, depth: int) -> typing.Optional[Analysis]:
+        """Looks up an analysis that is deep enough.
+
+        Args:
+            board: Position to look up.
+            depth: Minimum depth of the analysis.
+
+        Returns:
+            The stored analysis, None if not found or too shallow.
+        """
+        result = self.cache.get(board.epd())
+        if result is not None and result.depth >= depth:
+            return result
+        return None
+
+    async def search(
+        self,
+        board: chess.Board,
+        limit: engine.Limit,
+        report: typing.Optional[typing.Callable[[Analysis], None]] = None,
+    ) -> Analysis:
+        """Analyses a position with stockfish and stores the result.
+
+        Args:
+            board: Position to analyse.
+            limit: Search limit of the engine.
+            report: Callback for every complete line of the search.
+
+        Returns:
+            The analysis of the position.
+        """
+
+        async def run(api: engine.UciProtocol) -> engine.InfoDict:
+            with await api.analysis(board, limit, game=self) as analysis:
+                async for info in analysis:
+                    if report is not None and {"depth", "score", "pv"} <= set(
+                        info
+                    ):
+                        report(get_analysis(info))
+                return analysis.info
+
+        result = get_analysis(await self.pool.run(run))
+        if self.get(board, result.depth) is None:
+            self.cache.put(board.epd(), result)
+        return result
+
+    async def analyse(
+        self,
+        board: chess.Board,
+        depth: int,
+        report: typing.Optional[typing.Callable[[Analysis], None]] = None,
+        limit: typing.Optional[engine.Limit] = None,
+    ) -> Analysis:
+        """Analyses a position, reusing stored and running analyses.
+
+        Identical requests share one search, and the lines of the search are
+        reported to every request that is waiting for it.
+
+        Args:
+            board: Position to analyse.
+            depth: Minimum depth of the analysis.
+            report: Callback for every complete line of the search.
+            limit: Search limit of the engine, the depth if omitted.
+
+        Returns:
+            The analysis of the position.
+        """
+        result = self.get(board, depth)
+        if result is not None:
+            return result
+        limit = limit or engine.Limit(depth=depth)
+        key = f"{board.epd()} {limit!r}"
+        reports = self.reports.setdefault(key, [])
+        if report is not None:
+            reports.append(report)
+        if key not in self.jobs:
+
+            def fan(line: Analysis):
+                for each in list(reports):
+                    each(line)
+
+            job = asyncio.ensure_future(self.search(board.copy(), limit, fan))
+            self.jobs[key] = job
+            job.add_done_callback(lambda _: self.forget(key))
+        try:
+            return await asyncio.shield(self.jobs[key])
+        finally:
+            if report in reports:
+                reports.remove(report)
+
+    def forget(self, key: str):
+        """Forgets a finished analysis and its callbacks.
+
+        Args:
+            key: Position and search limit of the analysis.
+        """
+        self.jobs.pop(key, None)
+        self.reports.pop(key, None)
+
+    def close(self):
+        """Closes the store."""
+        self.cache.close()
+
+
+class Session:
+    """Compact state of a chess game.
+
+    Moves are packed into 16 bits each, with the source square in the low 6
+    bits, the target square in the next 6 bits and the promotion above. The
+    movetext is kept by the view of the game instead.
+
+    Attributes:
+        user: ID of the opponent of the bot.
+        name: Name of the opponent of the bot.
+        card: Name of the bot to use.
+        color: Orientation of the player.
+        level: Skill level of stockfish.
+        start: FEN of the starting position.
+        moves: Packed moves of the game.
+        key: Unique key of the game.
+        msg: ID of the message that holds the game, 0 if not sent or
+            ephemeral.
+        chan: ID of the channel of the message, 0 if not sent or
+            ephemeral.
+    """
+
+    __slots__ = (
+        "user",
+        "name",
+        "card",
+        "color",
+        "level",
+        "start",
+        "moves",
+        "key",
+        "msg",
+        "chan",
     )
-    return cairosvg.svg2png(result)
+
+    def __init__(
+        self,
+        user: int,
+        name: str,
+        card: str,
+        color: chess.Color,
+        level: int,
+        start: str = chess.STARTING_FEN,
+    ):
+        """Starts a game.
+
+        Args:
+            user: ID of the opponent of the bot.
+            name: Name of the opponent of the bot.
+            card: Name of the bot to use.
+            color: Orientation of the player.
+            level: Skill level of stockfish.
+            start: FEN of the starting position.
+        """
+        self.user, self.name, self.card = user, name, card
+        self.color, self.level, self.start = color, level, start
+        self.moves = array.array("H")
+        self.key = secrets.token_hex(8)
+        self.msg = self.chan = 0
+
+    def push(self, board: chess.Board, move: chess.Move):
+        """Records a move and makes it on the chessboard of the game.
+
+        Args:
+            board: Chessboard of the game.
+            move: Move to record.
+        """
+        board.push(move)
+        self.moves.append(
+            move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+        )
+
+    def board(self) -> chess.Board:
+        """Replays the game.
+
+        Returns:
+            The chessboard of the game.
+        """
+        board = chess.Board(self.start)
+        for code in self.moves:
+            board.push(
+                chess.Move(code & 63, code >> 6 & 63, code >> 12 or None)
+            )
+        return board
+
+
+class Registry:
+    """Registry of running chess games.
+
+    Attributes:
+        each: Maximum number of games of each user.
+        live: Maximum number of games in total.
+        games: Running games by user.
+        size: Number of running games.
+    """
+
+    def __init__(self, each: int, live: int):
+        """Initializes an empty registry.
+
+        Args:
+            each: Maximum number of games of each user.
+            live: Maximum number of games in total.
+        """
+        self.each, self.live = each, live
+        self.games: typing.Dict[int, typing.Set[Session]] = {}
+        self.size = 0
+
+    def open(self, session: Session) -> bool:
+        """Registers a game unless a limit is reached.
+
+        Args:
+            session: Game to register.
+
+        Returns:
+            Whether the game is registered.
+        """
+        games = self.games.get(session.user, set())
+        if self.size >= self.live or len(games) >= self.each:
+            return False
+        games.add(session)
+        self.games[session.user] = games
+        self.size += 1
+        return True
+
+    def close(self, session: Session):
+        """Unregisters a game.
+
+        Args:
+            session: Game to unregister.
+        """
+        games = self.games.get(session.user, set())
+        if session in games:
+            games.remove(session)
+            self.size -= 1
+        if not games:
+            self.games.pop(session.user, None)
+
+    def stat(self) -> str:
+        """Summarizes the running games.
+
+        Returns:
+            The summary of the running games.
+        """
+        used = sum(
+            sys.getsizeof(session)
+            + sum(
+                sys.getsizeof(value)
+                for value in (
+                    session.name,
+                    session.card,
+                    session.start,
+                    session.moves,
+                    session.key,
+                )
+            )
+            for games in self.games.values()
+            for session in games
+        )
+        return (
+            f"{self.size} of {self.live} games, {len(self.games)} users, "
+            f"{used} bytes"
+        )
+
+
+class GameStore:
+    """SQLite store of running chess games.
+
+    Changes are collected in memory and written in one transaction by a
+    single thread when flushed, so moves never wait for the disk.
+
+    Attributes:
+        conn: Connection to the store, None if not persisted.
+        dirty: Rows to write by key, None to delete.
+        pool: Thread that writes to the store.
+    """
+
+    def __init__(self, path: str):
+        """Opens the store.
+
+        Args:
+            path: Path of the SQLite store, empty to keep nothing.
+        """
+        self.conn: typing.Optional[sqlite3.Connection] = None
+        self.dirty: typing.Dict[str, typing.Optional[tuple]] = {}
+        self.pool = concurrent.futures.ThreadPoolExecutor(1)
+        if path:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS games(key TEXT PRIMARY KEY, "
+                "user INTEGER, name TEXT, card TEXT, color INTEGER, "
+                "level INTEGER, start TEXT, moves BLOB, msg INTEGER, "
+                "chan INTEGER, time REAL)"
+            )
+            self.conn.commit()
+
+    def save(self, session: Session):
+        """Marks a game to be written.
+
+        Games without a message are not written, since ephemeral messages
+        cannot be edited after a restart.
+
+        Args:
+            session: Game to write.
+        """
+        if self.conn is not None and session.msg:
+            self.dirty[session.key] = (
+                session.key,
+                session.user,
+                session.name,
+                session.card,
+                session.color,
+                session.level,
+                session.start,
+                session.moves.tobytes(),
+                session.msg,
+                session.chan,
+                time.time(),
+            )
+
+    def drop(self, session: Session):
+        """Marks a game to be deleted.
+
+        Args:
+            session: Game to delete.
+        """
+        if self.conn is not None:
+            self.dirty[session.key] = None
+
+    def write(self, rows: typing.Dict[str, typing.Optional[tuple]]):
+        """Writes changes to the store in one transaction.
+
+        Args:
+            rows: Rows to write by key, None to delete.
+        """
+        if self.conn is None:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO games VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [row for row in rows.values() if row is not None],
+            )
+            self.conn.executemany(
+                "DELETE FROM games WHERE key = ?",
+                [(key,) for (key, row) in rows.items() if row is None],
+            )
+
+    async def flush(self):
+        """Writes the pending changes to the store."""
+        rows, self.dirty = self.dirty, {}
+        if rows:
+            await asyncio.get_running_loop().run_in_executor(
+                self.pool, self.write, rows
+            )
+
+    def load(self, keep: float) -> typing.List[Session]:
+        """Reads the games and deletes those idle for too long.
+
+        Args:
+            keep: Seconds to keep idle games.
+
+        Returns:
+            The games in the store.
+        """
+        if self.conn is None:
+            return []
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM games WHERE time < ?", (time.time() - keep,)
+            )
+        sessions = []
+        for row in self.conn.execute(
+            "SELECT key, user, name, card, color, level, start, moves, msg, "
+            "chan FROM games"
+        ):
+            session = Session(row[1], row[2], row[3], bool(row[4]), row[5])
+            session.start, session.key = row[6], row[0]
+            session.msg, session.chan = row[8], row[9]
+            session.moves.frombytes(row[7])
+            sessions.append(session)
+        return sessions
+
+    def close(self):
+        """Stops the writer and closes the store."""
+        self.pool.shutdown()
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
 
 
 class ChessView(ui.View):
     """View for chess.
 
+    The chessboard is replayed from the session on every interaction, so
+    only the packed moves are kept between them. The movetext is appended
+    as moves are made and rebuilt only when the view is created. The view
+    is persistent so that it survives restarts, and it times out on its own
+    instead.
+
     Attributes:
         msg: Message that holds the view.
-        user: Opponent of the bot.
-        path: Path of the stockfish executable.
-        name: Name of the bot to use.
-        board: Chessboard of the game.
-        color: Orientation of the player.
-        level: Skill level of stockfish,
+        session: State of the game.
+        pool: Pool of stockfish engines.
+        imgs: Renderer of the board.
+        games: Registry of running games.
+        saves: Store of running games.
+        book: Book and tablebases to try before stockfish.
+        limit: Search limit of stockfish at the level of the game.
+        span: Seconds of inactivity before the view times out.
+        pgns: Whether to attach the PGN after every move.
+        text: Movetext of the game in SAN.
+        idle: Countdown to the timeout, None if not counting.
+        ponder: Expected move of the player and the search of the position
+            after it, None if not pondering.
     """
 
     def __init__(
         self,
-        board: chess.Board,
-        color: bool,
-        level: int,
+        session: Session,
         *,
-        ctx: commands.Context[base.Bot],
+        engines: pool.EnginePool,
+        images: Renderer,
+        games: Registry,
+        saves: GameStore,
+        book: typing.Optional[Book] = None,
+        limits: typing.Optional[typing.List[engine.Limit]] = None,
+        span: float = 300,
+        pgns: bool = True,
     ):
         """Initializes the view.
 
         Args:
-            board: Chessboard of the game.
-            color: Orientation of the player.
-            level: Skill level of stockfish,
-            ctx: Context of the view.
+            session: State of the game.
+            engines: Pool of stockfish engines.
+            images: Renderer of the board.
+            games: Registry of running games.
+            saves: Store of running games.
+            book: Book and tablebases to try before stockfish.
+            limits: Search limits of stockfish by level, depth 16 for
+                every level if omitted.
+            span: Seconds of inactivity before the view times out.
+            pgns: Whether to attach the PGN after every move.
         """
         self.msg: typing.Optional[discord.Message] = None
-        self.user = ctx.author
-        self.path: str = ctx.bot.cfg["feynmanium"]["cogs"]["game"]["path"]
-        self.name: str = ctx.bot.cfg["feynmanium"]["cogs"]["game"]["card"][
-            level
-        ]
-        self.board, self.color, self.level = board, color, level
-        super().__init__(timeout=300)
+        self.session = session
+        self.pool = engines
+        self.imgs = images
+        self.games = games
+        self.saves = saves
+        self.book = book
+        self.limit = limits[session.level] if limits else None
+        self.span, self.pgns = span, pgns
+        self.text = chess.Board(session.start).variation_san(
+            session.board().move_stack
+        )
+        self.idle: typing.Optional[asyncio.Task] = None
+        self.ponder: typing.Optional[
+            typing.Tuple[chess.Move, asyncio.Task]
+        ] = None
+        super().__init__(timeout=None)
+        self.src.custom_id = f"chess:{session.key}:src"
+        self.dest.custom_id = f"chess:{session.key}:dest"
+        self.save.custom_id = f"chess:{session.key}:save"
+        self.touch()
+
+    def touch(self):
+        """Restarts the countdown to the timeout."""
+        if self.idle is not None:
+            self.idle.cancel()
+        self.idle = asyncio.create_task(self.expire())
+
+    async def expire(self):
+        """Times out the view after a period of inactivity."""
+        await asyncio.sleep(self.span)
+        self.idle = None
+        await self.on_timeout()
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """Accepts interactions of the player only.
+
+        Args:
+            interaction: Interaction to check.
+
+        Returns:
+            Whether the interaction is from the player.
+        """
+        if interaction.user.id != self.session.user:
+            return False
+        pool.CLAIM.set(
+            pool.Claim(
+                interaction.guild_id or 0, interaction.user.id, pool.PLAY
+            )
+        )
+        self.touch()
+        return True
+
+    def push(self, board: chess.Board, move: chess.Move):
+        """Records a move with its SAN and makes it on the chessboard.
+
+        Args:
+            board: Chessboard of the game.
+            move: Move to record.
+        """
+        san = board.san(move)
+        if board.turn == chess.WHITE:
+            san = f"{board.fullmove_number}. {san}"
+        elif not self.text:
+            san = f"{board.fullmove_number}...{san}"
+        self.text = f"{self.text} {san}" if self.text else san
+        self.session.push(board, move)
 
-    def get_pgn(self) -> pgn.Game:
-        """Gets the PGN of the game.
+    def get_pgn(self, board: chess.Board) -> str:
+        """Gets the PGN of the game from its movetext.
+
+        Args:
+            board: Chessboard of the game.
 
         Returns:
             The PGN of the game.
         """
-        game = pgn.Game.from_board(self.board)
-        game.headers["Event"] = "Live Chess"
-        game.headers["Site"] = "Discord"
-        game.headers["Date"] = datetime.date.today().strftime("%Y.%m.%d")
-        game.headers["Round"] = "-"
-        if self.color == chess.WHITE:
-            game.headers["White"] = self.user.name
-            game.headers["Black"] = self.name
+        if self.session.color == chess.WHITE:
+            white, black = self.session.name, self.session.card
         else:
-            game.headers["White"] = self.name
-            game.headers["Black"] = self.user.name
-        return game
+            white, black = self.session.card, self.session.name
+        headers = [
+            ("Event", "Live Chess"),
+            ("Site", "Discord"),
+            ("Date", datetime.date.today().strftime("%Y.%m.%d")),
+            ("Round", "-"),
+            ("White", white),
+            ("Black", black),
+            ("Result", board.result()),
+        ]
+        if self.session.start != chess.STARTING_FEN:
+            headers += [("SetUp", "1"), ("FEN", self.session.start)]
+        text = "".join(
+            '[{} "{}"]\n'.format(
+                key, value.replace("\\", "\\\\").replace('"', '\\"')
+            )
+            for (key, value) in headers
+        )
+        return (
+            text
+            + "\n"
+            + textwrap.fill(f"{self.text} {board.result()}".strip(), 79)
+            + "\n"
+        )
 
-    def update(self, default: str):
+    def get_files(
+        self, board: chess.Board, image: bytes
+    ) -> typing.List[discord.File]:
+        """Gets the attachments of the game.
+
+        The PGN is attached after every move only if enabled, and always at
+        the end of the game.
+
+        Args:
+            board: Chessboard of the game.
+            image: Rendered PNG of the chessboard.
+
+        Returns:
+            The attachments of the game.
+        """
+        files = [discord.File(io.BytesIO(image), "board.png")]
+        if self.pgns or board.is_game_over():
+            files.append(
+                discord.File(
+                    io.BytesIO(self.get_pgn(board).encode()), "game.pgn"
+                )
+            )
+        return files
+
+    def update(self, board: chess.Board, default: str):
         """Updates the options after selecting a source.
 
         Args:
+            board: Chessboard of the game.
             default: Selected source square.
         """
-        squares = {move.from_square for move in self.board.legal_moves}
+        squares = {move.from_square for move in board.legal_moves}
         self.src.options = []
         for square in squares:
-            piece = self.board.piece_type_at(square)
+            piece = board.piece_type_at(square)
             if piece is not None:
                 self.src.options.append(
                     discord.SelectOption(
@@ -146,25 +1110,111 @@ class ChessView(ui.View):
             self.src.options = []
         self.src.disabled = False
 
-    async def make_move(self):
-        """Makes a move and updates the options."""
-        if not self.board.is_game_over() and self.board.turn != self.color:
-            self.board.push(await get_move(self.path, self.board, self.level))
-        if self.board.is_game_over():
+    async def think(self, board: chess.Board) -> engine.PlayResult:
+        """Searches a position outside of the span of any command.
+
+        The search is queued behind the moves of players.
+
+        Args:
+            board: Position to search.
+
+        Returns:
+            The result of stockfish.
+        """
+        metric.SPAN.set(None)
+        pool.CLAIM.set(pool.CLAIM.get()._replace(prio=pool.LOOK))
+        return await get_play(
+            self.pool, board, self.session.level, self, self.book, self.limit
+        )
+
+    def stop_ponder(self):
+        """Cancels the search of the expected position."""
+        if self.ponder is not None:
+            self.ponder[1].cancel()
+            self.ponder = None
+
+    def close(self):
+        """Stops pondering, the countdown and the view, keeping the game."""
+        self.stop_ponder()
+        if self.idle is not None:
+            self.idle.cancel()
+            self.idle = None
+        self.stop()
+
+    def end(self):
+        """Stops the view and forgets the game."""
+        self.close()
+        self.games.close(self.session)
+        self.saves.drop(self.session)
+
+    async def reply(self, board: chess.Board) -> engine.PlayResult:
+        """Plays the current position, reusing a matching pondered search.
+
+        A pondered search that failed or was cancelled is searched again.
+
+        Args:
+            board: Chessboard of the game.
+
+        Returns:
+            The result of stockfish.
+        """
+        if self.ponder is not None:
+            move, job = self.ponder
+            if board.move_stack and board.peek() == move:
+                self.ponder = None
+                await asyncio.wait([job])
+                if not job.cancelled() and job.exception() is None:
+                    return job.result()
+            self.stop_ponder()
+        return await get_play(
+            self.pool, board, self.session.level, self, self.book, self.limit
+        )
+
+    async def make_move(
+        self, board: typing.Optional[chess.Board] = None
+    ) -> chess.Board:
+        """Makes a move, ponders on the expected reply and updates options.
+
+        Args:
+            board: Chessboard of the game, replayed if omitted.
+
+        Returns:
+            The chessboard after the move.
+        """
+        if board is None:
+            board = self.session.board()
+        if not board.is_game_over() and board.turn != self.session.color:
+            with pool.priority(pool.PLAY):
+                result = await self.reply(board)
+            self.push(board, result.move or chess.Move.null())
+            self.saves.save(self.session)
+            if result.ponder is not None and board.is_legal(result.ponder):
+                after = board.copy()
+                after.push(result.ponder)
+                if not after.is_game_over():
+                    self.ponder = (
+                        result.ponder,
+                        asyncio.create_task(self.think(after)),
+                    )
+        if board.is_game_over():
             self.src.options = []
             self.src.disabled = True
+            self.end()
         else:
-            self.update("")
+            self.update(board, "")
         self.dest.options = []
         self.dest.disabled = True
+        return board
 
     async def on_timeout(self):
-        """Disables all items on timeout."""
+        """Ends the game and disables all items on timeout."""
+        self.end()
         for item in self.children:
             if isinstance(item, (ui.Button, ui.Select)):
                 item.disabled = True
         if self.msg is not None:
-            await self.msg.edit(view=self)
+            with contextlib.suppress(discord.HTTPException):
+                await self.msg.edit(view=self)
 
     @ui.select(options=[], placeholder="Select the source square", row=0)
     async def src(self, interaction: discord.Interaction, select: ui.Select):
@@ -173,16 +1223,15 @@ class ChessView(ui.View):
         Args:
             interaction: Interaction of the selection.
             select: Select menu of the selection.
-        """
-        if interaction.user != self.user:
-            return
+        """
         await interaction.response.defer()
-        self.update(select.values[0])
+        board = self.session.board()
+        self.update(board, select.values[0])
         self.dest.options = [
             discord.SelectOption(
-                label=self.board.san(move), description=self.board.lan(move)
+                label=board.san(move), description=board.lan(move)
             )
-            for move in self.board.legal_moves
+            for move in board.legal_moves
             if move.from_square == chess.parse_square(select.values[0])
         ]
         self.dest.disabled = False
@@ -196,25 +1245,95 @@ class ChessView(ui.View):
             interaction: Interaction of the selection.
             select: Select menu of the selection.
         """
-        if interaction.user != self.user:
-            return
         await interaction.response.defer()
-        self.board.push_san(select.values[0])
-        await self.make_move()
-        fen = self.board.fen()
+        board = self.session.board()
+        self.push(board, board.parse_san(select.values[0]))
+        board = await self.make_move(board)
+        fen = board.fen()
+        image = await self.imgs.render(board, self.session.color)
         await interaction.edit_original_response(
             content=f"`{fen}`",
-            attachments=[
-                discord.File(
-                    io.BytesIO(get_svg(self.board, self.color)), "board.png"
-                ),
-                discord.File(
-                    io.BytesIO(bytes(str(self.get_pgn()), "utf-8")), "game.pgn"
-                ),
-            ],
+            attachments=self.get_files(board, image),
             view=self,
         )
 
+    @ui.button(label="PGN", row=2)
+    async def save(self, interaction: discord.Interaction, button: ui.Button):
+        """Sends the PGN of the game.
+
+        Args:
+            interaction: Interaction of the operation.
+            button: Button of the operation.
+        """
+        del button
+        await interaction.response.send_message(
+            file=discord.File(
+                io.BytesIO(self.get_pgn(self.session.board()).encode()),
+                "game.pgn",
+            ),
+            ephemeral=True,
+        )
+
+
+class GameIndex:
+    """Index of the boards in a game tree.
+
+    Nodes are indexed in preorder with the main variation first until the
+    size limit is reached. Other nodes are computed on demand.
+
+    Attributes:
+        boards: Boards of indexed nodes.
+        sans: SAN of the variations of indexed nodes.
+    """
+
+    def __init__(self, game: pgn.GameNode, size: int):
+        """Indexes a game tree.
+
+        Args:
+            game: Root of the game tree.
+            size: Maximum number of nodes to index.
+        """
+        self.boards: typing.Dict[pgn.GameNode, chess.Board] = {}
+        self.sans: typing.Dict[pgn.GameNode, typing.List[str]] = {}
+        stack = [(game, game.board())]
+        while stack and len(self.boards) < size:
+            node, board = stack.pop()
+            self.boards[node] = board
+            self.sans[node] = [
+                board.san(child.move) for child in node.variations
+            ]
+            for child in reversed(node.variations):
+                child_board = board.copy(stack=False)
+                child_board.push(child.move)
+                stack.append((child, child_board))
+
+    def board(self, node: pgn.GameNode) -> chess.Board:
+        """Gets the board of a node.
+
+        Args:
+            node: Node of the game tree.
+
+        Returns:
+            The board of the node, which must not be modified.
+        """
+        if node in self.boards:
+            return self.boards[node]
+        return node.board()
+
+    def san(self, node: pgn.GameNode) -> typing.List[str]:
+        """Gets the SAN of the variations of a node.
+
+        Args:
+            node: Node of the game tree.
+
+        Returns:
+            The SAN of the variations.
+        """
+        if node in self.sans:
+            return self.sans[node]
+        board = node.board()
+        return [board.san(child.move) for child in node.variations]
+
 
 class GameView(ui.View):
     """View for game.
@@ -222,22 +1341,51 @@ class GameView(ui.View):
     Attributes:
         msg: Message that holds the view.
         user: Opponent of the bot.
+        imgs: Renderer of the board.
+        index: Index of the game tree.
         node: PGN node of the state.
     """
 
-    def __init__(self, node: pgn.GameNode, *, ctx: commands.Context[base.Bot]):
+    def __init__(
+        self,
+        node: pgn.GameNode,
+        *,
+        ctx: commands.Context[base.Bot],
+        images: Renderer,
+        index: GameIndex,
+    ):
         """Initializes the view.
 
         Args:
             node: PGN node of the state.
             ctx: Context of the view.
+            images: Renderer of the board.
+            index: Index of the game tree.
         """
         super().__init__(timeout=300)
         self.msg: typing.Optional[discord.Message] = None
         self.user = ctx.author
+        self.imgs = images
+        self.index = index
         self.node = node
         self.update()
 
+    async def render(self) -> bytes:
+        """Renders the current position.
+
+        Returns:
+            The rendered PNG.
+        """
+        board = self.index.board(self.node)
+        return await self.imgs.render(board, board.turn)
+
+    def prefetch(self):
+        """Renders the neighbouring positions in the background."""
+        for node in [self.node.parent] + self.node.variations:
+            if node is not None:
+                board = self.index.board(node)
+                self.imgs.prefetch(board, board.turn)
+
     def update(self):
         """Updates item availability."""
         self.root.disabled = self.node.parent is None
@@ -245,15 +1393,10 @@ class GameView(ui.View):
         self.main.disabled = self.node.is_main_variation()
         self.next.disabled = self.node.is_end()
         self.leaf.disabled = self.node.is_end()
-        self.move.options = []
-        for child in self.node.variations:
-            if child.move is not None:
-                self.move.options.append(
-                    discord.SelectOption(
-                        label=self.node.board().san(child.move),
-                        description=self.node.board().san(child.move),
-                    )
-                )
+        self.move.options = [
+            discord.SelectOption(label=san, description=san)
+            for san in self.index.san(self.node)
+        ]
         if self.move.options:
             self.move.disabled = False
         else:
@@ -267,15 +1410,12 @@ class GameView(ui.View):
             interaction: Interaction of the update.
         """
         self.update()
+        image = await self.render()
         await interaction.edit_original_response(
-            attachments=[
-                discord.File(
-                    io.BytesIO(get_svg(self.node.board(), self.node.turn())),
-                    "board.png",
-                )
-            ],
+            attachments=[discord.File(io.BytesIO(image), "board.png")],
             view=self,
         )
+        self.prefetch()
 
     @ui.button(label="<<", style=discord.ButtonStyle.primary, row=0)
     async def root(self, interaction: discord.Interaction, button: ui.Button):
@@ -371,22 +1511,391 @@ class GameView(ui.View):
         if interaction.user != self.user:
             return
         await interaction.response.defer()
-        move = self.node.board().parse_san(select.values[0])
+        move = self.index.board(self.node).parse_san(select.values[0])
         if self.node.has_variation(move):
             self.node = self.node.variation(move)
         await self.sync(interaction)
 
 
+async def get_file(http: aiohttp.ClientSession, url: str) -> typing.TextIO:
+    """Downloads a file in chunks to a temporary file.
+
+    Args:
+        http: Client session to download with.
+        url: URL of the file.
+
+    Returns:
+        The downloaded file opened in text mode.
+    """
+    handle = tempfile.TemporaryFile()
+    try:
+        async with http.get(url) as resp:
+            resp.raise_for_status()
+            async for chunk in resp.content.iter_chunked(1 << 16):
+                handle.write(chunk)
+    except BaseException:
+        handle.close()
+        raise
+    handle.seek(0)
+    return io.TextIOWrapper(handle, encoding="utf-8", errors="replace")
+
+
+def get_index(handle: typing.TextIO) -> typing.List[int]:
+    """Indexes the games in a PGN file by reading their headers only.
+
+    Args:
+        handle: PGN file opened in text mode.
+
+    Returns:
+        The offsets of the games.
+    """
+    offsets = []
+    while True:
+        offset = handle.tell()
+        if pgn.read_headers(handle) is None:
+            return offsets
+        offsets.append(offset)
+
+
+def get_boards(
+    handle: typing.TextIO, epd: bool, plies: int
+) -> typing.List[chess.Board]:
+    """Collects the distinct positions of an EPD or PGN file.
+
+    Args:
+        handle: EPD or PGN file opened in text mode.
+        epd: Whether the file is an EPD file.
+        plies: Maximum number of plies to follow in each game.
+
+    Returns:
+        The distinct positions.
+    """
+    boards: typing.Dict[str, chess.Board] = {}
+    if epd:
+        for line in handle:
+            if line.strip():
+                with contextlib.suppress(ValueError):
+                    board = chess.Board.from_epd(line)[0]
+                    boards.setdefault(board.epd(), board)
+        return list(boards.values())
+    while True:
+        node = pgn.read_game(handle)
+        if node is None:
+            return list(boards.values())
+        board = node.board()
+        for move in node.mainline_moves():
+            if board.ply() >= plies:
+                break
+            boards.setdefault(board.epd(), board.copy(stack=False))
+            board.push(move)
+
+
+async def send_game(
+    ctx: commands.Context[base.Bot], node: pgn.Game, *, images: Renderer
+):
+    """Sends a view to browse a game.
+
+    Args:
+        ctx: Context of the command.
+        node: Game to browse.
+        images: Renderer of the board.
+    """
+    view = GameView(
+        node,
+        ctx=ctx,
+        images=images,
+        index=GameIndex(node, ctx.bot.cfg.cogs.game.node),
+    )
+    image = await view.render()
+    view.msg = await ctx.send(
+        file=discord.File(io.BytesIO(image), "board.png"),
+        view=view,
+        ephemeral=True,
+    )
+    view.prefetch()
+
+
+class PgnView(ui.View):
+    """View for a PGN with many games.
+
+    Attributes:
+        msg: Message that holds the view.
+        ctx: Context of the view.
+        imgs: Renderer of the board.
+        file: PGN file opened in text mode.
+        offsets: Offsets of the games.
+        page: Index of the current page.
+    """
+
+    def __init__(
+        self,
+        handle: typing.TextIO,
+        offsets: typing.List[int],
+        *,
+        ctx: commands.Context[base.Bot],
+        images: Renderer,
+    ):
+        """Initializes the view.
+
+        Args:
+            handle: PGN file opened in text mode.
+            offsets: Offsets of the games.
+            ctx: Context of the view.
+            images: Renderer of the board.
+        """
+        super().__init__(timeout=300)
+        self.msg: typing.Optional[discord.Message] = None
+        self.ctx = ctx
+        self.imgs = images
+        self.file = handle
+        self.offsets = offsets
+        self.page = 0
+        self.update()
+
+    def update(self):
+        """Lists the games of the current page."""
+        begin = self.page * 25
+        end = min(begin + 25, len(self.offsets))
+        self.select.options = []
+        for idx in range(begin, end):
+            self.file.seek(self.offsets[idx])
+            headers = pgn.read_headers(self.file) or pgn.Headers()
+            label = (
+                f"{idx + 1}. {headers.get('White', '?')} - "
+                f"{headers.get('Black', '?')}"
+            )
+            desc = ", ".join(
+                headers.get(key, "?") for key in ("Event", "Date", "Result")
+            )
+            self.select.options.append(
+                discord.SelectOption(
+                    label=label[:100], description=desc[:100], value=str(idx)
+                )
+            )
+        self.prev.disabled = self.page == 0
+        self.next.disabled = end == len(self.offsets)
+
+    def content(self) -> str:
+        """Describes the current page.
+
+        Returns:
+            The description of the page.
+        """
+        pages = (len(self.offsets) + 24) // 25
+        return (
+            f"Found {len(self.offsets)} games. "
+            f"Page {self.page + 1} of {pages}."
+        )
+
+    def close(self):
+        """Stops the view and closes the file."""
+        self.stop()
+        self.file.close()
+
+    async def on_timeout(self):
+        """Disables all items and closes the file on timeout."""
+        for item in self.children:
+            if isinstance(item, (ui.Button, ui.Select)):
+                item.disabled = True
+        self.file.close()
+        if self.msg is not None:
+            with contextlib.suppress(discord.HTTPException):
+                await self.msg.edit(view=self)
+
+    @ui.button(label="<", row=0)
+    async def prev(self, interaction: discord.Interaction, button: ui.Button):
+        """Go to the previous page.
+
+        Args:
+            interaction: Interaction of the operation.
+            button: Button of the operation.
+        """
+        del button
+        if interaction.user != self.ctx.author:
+            return
+        await interaction.response.defer()
+        self.page = max(self.page - 1, 0)
+        self.update()
+        await interaction.edit_original_response(
+            content=self.content(), view=self
+        )
+
+    @ui.button(label=">", row=0)
+    async def next(self, interaction: discord.Interaction, button: ui.Button):
+        """Go to the next page.
+
+        Args:
+            interaction: Interaction of the operation.
+            button: Button of the operation.
+        """
+        del button
+        if interaction.user != self.ctx.author:
+            return
+        await interaction.response.defer()
+        if (self.page + 1) * 25 < len(self.offsets):
+            self.page += 1
+        self.update()
+        await interaction.edit_original_response(
+            content=self.content(), view=self
+        )
+
+    @ui.select(options=[], placeholder="Select the game", row=1)
+    async def select(self, interaction: discord.Interaction, select: ui.Select):
+        """Opens the selected game.
+
+        Args:
+            interaction: Interaction of the selection.
+            select: Select menu of the selection.
+        """
+        if interaction.user != self.ctx.author:
+            return
+        await interaction.response.defer()
+        self.file.seek(self.offsets[int(select.values[0])])
+        node = pgn.read_game(self.file)
+        if node is None:
+            await self.ctx.send("Invalid PGN.", ephemeral=True)
+            return
+        await send_game(self.ctx, node, images=self.imgs)
+
+
+def get_book(cfg: conf.Game) -> Book:
+    """Opens the book and the tablebases of a configuration.
+
+    Args:
+        cfg: Configuration of the chess commands.
+
+    Returns:
+        The book and the tablebases.
+    """
+    return Book(cfg.book, cfg.tbs, cfg.ply, cfg.men, cfg.tbl)
+
+
 class GameCog(commands.Cog, name="Chessboard"):
     """Chess related commands.
 
     Attributes:
         bot: Bot that contains the cog.
+        pool: Pool of stockfish engines.
+        imgs: Renderer of boards.
+        store: Persistent store of analyses.
+        games: Registry of running games.
+        saves: Store of running games.
+        book: Book and tablebases to try before stockfish.
+        olds: Books replaced on reload, kept open until no running game
+            uses them.
+        views: Views of running games, stopped on unload.
+        pages: Views of PGN files, stopped on unload.
+        http: Client session to download files with.
+        limits: Search limits of stockfish by level.
     """
 
-    def __init__(self, bot):
-        """Initialize the cog."""
+    def __init__(self, bot: base.Bot):
+        """Initialize the cog.
+
+        Args:
+            bot: Bot that contains the cog.
+        """
         self.bot = bot
+        self.pool = pool.EnginePool(
+            bot.cfg.cogs.game.path,
+            bot.cfg.cogs.game.pool,
+            bot.cfg.cogs.game.thrd,
+            bot.cfg.cogs.game.hash,
+        )
+        self.imgs = Renderer(bot.cfg.cogs.game.imgs << 20)
+        self.store = AnalysisStore(
+            self.pool, bot.cfg.cogs.game.size, bot.cfg.cogs.game.file
+        )
+        self.games = Registry(bot.cfg.cogs.game.each, bot.cfg.cogs.game.live)
+        self.saves = GameStore(bot.cfg.cogs.game.sess)
+        self.book = get_book(bot.cfg.cogs.game)
+        self.olds: typing.List[Book] = []
+        self.views: weakref.WeakSet[ChessView] = weakref.WeakSet()
+        self.pages: weakref.WeakSet[PgnView] = weakref.WeakSet()
+        self.http = aiohttp.ClientSession()
+        self.limits = [engine.Limit(**lim) for lim in bot.cfg.cogs.game.lims]
+        self.sync.change_interval(  # pylint: disable=no-member
+            seconds=bot.cfg.cogs.game.sync
+        )
+        self.sync.start()  # pylint: disable=no-member
+
+    @commands.Cog.listener()
+    async def on_config_reload(self, old: conf.Config, new: conf.Config):
+        """Applies a reloaded configuration to new games.
+
+        Running games keep their book and search limits. Engines, caches and
+        stores keep their sizes until the extension is reloaded.
+
+        Args:
+            old: Previous configuration.
+            new: Reloaded configuration.
+        """
+        cfg = new.cogs.game
+        self.limits = [engine.Limit(**lim) for lim in cfg.lims]
+        self.sync.change_interval(seconds=cfg.sync)  # pylint: disable=no-member
+        keys = operator.attrgetter("book", "tbs", "ply", "men", "tbl")
+        if keys(old.cogs.game) != keys(cfg):
+            self.olds.append(self.book)
+            self.book = get_book(cfg)
+            self.prune()
+
+    def prune(self):
+        """Closes the replaced books that no running game uses."""
+        used = {id(view.book) for view in self.views if not view.is_finished()}
+        for book in [book for book in self.olds if id(book) not in used]:
+            self.olds.remove(book)
+            book.close()
+
+    async def cog_load(self):
+        """Resumes the games in the store."""
+        sessions = await asyncio.get_running_loop().run_in_executor(
+            self.saves.pool, self.saves.load, self.bot.cfg.cogs.game.keep
+        )
+        for session in sessions:
+            if not session.msg or not self.games.open(session):
+                self.saves.drop(session)
+                continue
+            view = self.get_view(session)
+            board = session.board()
+            view.update(board, "")
+            view.dest.disabled = True
+            view.msg = self.bot.get_partial_messageable(
+                session.chan
+            ).get_partial_message(session.msg)
+            self.bot.add_view(view, message_id=session.msg)
+
+    def cog_unload(self):  # pylint: disable=invalid-overridden-method
+        """Stops writing games."""
+        self.sync.cancel()  # pylint: disable=no-member
+
+    @tasks.loop(seconds=5)
+    async def sync(self):
+        """Writes the changes of games to the store and closes old books."""
+        await self.saves.flush()
+        self.prune()
+
+    def get_view(self, session: Session) -> ChessView:
+        """Creates the view of a game.
+
+        Args:
+            session: State of the game.
+
+        Returns:
+            The view of the game.
+        """
+        view = ChessView(
+            session,
+            engines=self.pool,
+            images=self.imgs,
+            games=self.games,
+            saves=self.saves,
+            book=self.book,
+            limits=self.limits,
+            span=self.bot.cfg.cogs.game.idle,
+            pgns=self.bot.cfg.cogs.game.pgns,
+        )
+        self.views.add(view)
+        return view
 
     @commands.hybrid_command()
     async def chess(
@@ -404,59 +1913,103 @@ class GameCog(commands.Cog, name="Chessboard"):
         """
         if fst is None:
             fst = bool(secrets.randbelow(2))
-        view = ChessView(chess.Board(), fst, lvl, ctx=ctx)
-        await view.make_move()
-        fen = view.board.fen()
+        session = Session(
+            ctx.author.id,
+            ctx.author.name,
+            self.bot.cfg.cogs.game.card[lvl],
+            fst,
+            lvl,
+        )
+        if not self.games.open(session):
+            await ctx.send(
+                "Too many games are running. Finish one first.", ephemeral=True
+            )
+            return
+        view = self.get_view(session)
+        board = await view.make_move()
+        fen = board.fen()
+        image = await self.imgs.render(board, fst)
         view.msg = await ctx.send(
             f"`{fen}`",
-            files=[
-                discord.File(io.BytesIO(get_svg(view.board, fst)), "board.png"),
-                discord.File(
-                    io.BytesIO(bytes(str(view.get_pgn()), "utf-8")), "game.pgn"
-                ),
-            ],
+            files=view.get_files(board, image),
             view=view,
             ephemeral=True,
         )
+        if ctx.interaction is None:
+            session.msg, session.chan = view.msg.id, ctx.channel.id
+            self.saves.save(session)
 
     @commands.hybrid_command()
-    async def anlys(self, ctx: commands.Context[base.Bot], fen: str):
+    @app_commands.rename(secs="time")
+    async def anlys(
+        self,
+        ctx: commands.Context[base.Bot],
+        fen: str,
+        depth: commands.Range[int, 1, 40] = 20,
+        secs: typing.Optional[commands.Range[float, 0.1, 60.0]] = None,
+        nodes: typing.Optional[commands.Range[int, 1000]] = None,
+    ):
         """Asks for some analysis for chess.
 
         Args:
             ctx: Context of the command.
             fen: FEN of the game.
+            depth: Depth of the analysis.
+            secs: Time budget of the analysis in seconds.
+            nodes: Node budget of the analysis.
         """
-        await ctx.defer()
         board = chess.Board(fen)
-        _, stockfish = await engine.popen_uci(
-            self.bot.cfg["feynmanium"]["cogs"]["game"]["path"]
-        )
-        info = await stockfish.analyse(board, engine.Limit(depth=20))
-        await stockfish.quit()
-        score: engine.Score
-        try:
-            score = info["score"].white()
-        except RuntimeError:
-            score = engine.Cp(0)
-        wdl = round(score.wdl(model="lichess").expectation() * 100, 2)
-        if score == engine.Mate(0):
-            result = "#"
-        elif score.is_mate():
-            mate = score.mate()
-            if mate is not None:
-                result = "#" + str(mate)
-            else:
-                result = "#-0"
-        else:
-            result = str(round(score.score(mate_score=100) / 100, 2))
-        await ctx.send(
-            f"White has an advantage of {result} ({wdl}%).",
+        info = self.store.get(board, depth)
+        if info is not None:
+            await ctx.send(
+                get_text(board, info),
+                file=discord.File(
+                    io.BytesIO(await self.imgs.render(board, board.turn)),
+                    "board.png",
+                ),
+                ephemeral=True,
+            )
+            return
+        await ctx.defer()
+        cfg = self.bot.cfg.cogs.game
+        msg = await ctx.send(
+            "Analysing...",
             file=discord.File(
-                io.BytesIO(get_svg(board, board.turn)), "board.png"
+                io.BytesIO(await self.imgs.render(board, board.turn)),
+                "board.png",
             ),
             ephemeral=True,
         )
+        steps = [step for step in cfg.step if step < depth]
+        lines: typing.List[Analysis] = []
+        event = asyncio.Event()
+
+        def report(line: Analysis):
+            lines.append(line)
+            while steps and line.depth >= steps[0]:
+                steps.pop(0)
+                event.set()
+
+        async def edit():
+            while True:
+                await event.wait()
+                event.clear()
+                await msg.edit(content=get_text(board, lines[-1]))
+                await asyncio.sleep(cfg.rate)
+
+        task = asyncio.create_task(edit())
+        try:
+            info = await self.store.analyse(
+                board,
+                depth,
+                report,
+                engine.Limit(
+                    depth=depth, time=secs or cfg.time or None, nodes=nodes
+                ),
+            )
+        finally:
+            task.cancel()
+        await msg.edit(content=get_text(board, info))
 
     @commands.hybrid_command()
     async def game(
@@ -466,24 +2019,151 @@ class GameCog(commands.Cog, name="Chessboard"):
 
         Args:
             ctx: Context of the command.
-            file: PGN of the game.
+            file: PGN of the games.
         """
-        node = pgn.read_game(
-            io.StringIO(str(await file.read(), encoding="utf-8"))
+        await ctx.defer(ephemeral=True)
+        handle = await get_file(self.http, file.url)
+        offsets = await asyncio.get_running_loop().run_in_executor(
+            None, get_index, handle
         )
+        if len(offsets) > 1:
+            view = PgnView(handle, offsets, ctx=ctx, images=self.imgs)
+            self.pages.add(view)
+            view.msg = await ctx.send(view.content(), view=view, ephemeral=True)
+            return
+        with handle:
+            handle.seek(0)
+            node = pgn.read_game(handle)
         if node is None:
             await ctx.send("Invalid PGN.", ephemeral=True)
             return
-        view = GameView(node, ctx=ctx)
-        view.msg = await ctx.send(
-            file=discord.File(
-                io.BytesIO(get_svg(view.node.board(), view.node.turn())),
-                "board.png",
-            ),
-            view=view,
+        await send_game(ctx, node, images=self.imgs)
+
+    @commands.hybrid_command()
+    async def batch(
+        self,
+        ctx: commands.Context[base.Bot],
+        file: typing.Optional[discord.Attachment] = None,
+        fens: str = "",
+        lines: commands.Range[int, 1, 5] = 3,
+        depth: commands.Range[int, 1, 30] = 12,
+    ):
+        """Analyses every position of a game or a list of FENs.
+
+        Args:
+            ctx: Context of the command.
+            file: PGN of the game.
+            fens: FENs separated by commas.
+            lines: Number of best lines to show for each position.
+            depth: Depth of the analyses.
+        """
+        await ctx.defer(ephemeral=True)
+        most = self.bot.cfg.cogs.game.most
+        boards: typing.List[chess.Board] = []
+        if file is not None:
+            with await get_file(self.http, file.url) as handle:
+                node = await asyncio.get_running_loop().run_in_executor(
+                    None, pgn.read_game, handle
+                )
+            if node is None:
+                await ctx.send("Invalid PGN.", ephemeral=True)
+                return
+            board = node.board()
+            boards.append(board.copy())
+            for move in node.mainline_moves():
+                if len(boards) >= most:
+                    break
+                board.push(move)
+                boards.append(board.copy())
+        else:
+            boards = [
+                chess.Board(fen.strip())
+                for fen in fens.split(",")
+                if fen.strip()
+            ][:most]
+        if not boards:
+            await ctx.send("No positions to analyse.", ephemeral=True)
+            return
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        with pool.priority(pool.BULK):
+            infos = await asyncio.gather(
+                *(
+                    self.pool.analyse(
+                        board,
+                        engine.Limit(depth=depth),
+                        game=self.store,
+                        multipv=lines,
+                    )
+                    for board in boards
+                )
+            )
+        spent = loop.time() - start
+        report = await loop.run_in_executor(
+            None, get_report, boards, infos, file is not None
+        )
+        graph = await loop.run_in_executor(
+            None, cairosvg.svg2png, get_graph(infos)
+        )
+        await ctx.send(
+            f"Analysed {len(boards)} positions in {spent:.2f} s "
+            f"({len(boards) / spent:.2f} positions/s).",
+            files=[
+                discord.File(io.BytesIO(graph), "graph.png"),
+                discord.File(io.BytesIO(report.encode()), "report.txt"),
+            ],
             ephemeral=True,
         )
 
+    @commands.command()
+    @commands.is_owner()
+    async def games(self, ctx: commands.Context[base.Bot]):
+        """Shows statistics of the running games.
+
+        Args:
+            ctx: Context of the command.
+        """
+        await ctx.send(
+            f"Running games: {self.games.stat()}\n"
+            f"Moves: {self.book.stat()}\n"
+            f"Engines: {self.pool.stat()}"
+        )
+
+    @commands.command()
+    @commands.is_owner()
+    async def warm(
+        self,
+        ctx: commands.Context[base.Bot],
+        file: discord.Attachment,
+        depth: int = 20,
+        plies: int = 16,
+    ):
+        """Fills the analysis store from an EPD or PGN file.
+
+        Args:
+            ctx: Context of the command.
+            file: EPD or PGN file of the positions.
+            depth: Depth of the analyses.
+            plies: Maximum number of plies to follow in each game.
+        """
+        with await get_file(self.http, file.url) as handle:
+            boards = await asyncio.get_running_loop().run_in_executor(
+                None,
+                get_boards,
+                handle,
+                file.filename.lower().endswith(".epd"),
+                plies,
+            )
+        boards = [
+            board for board in boards if self.store.get(board, depth) is None
+        ]
+        await ctx.send(f"Analysing {len(boards)} positions.")
+        with pool.priority(pool.BULK):
+            await asyncio.gather(
+                *(self.store.analyse(board, depth) for board in boards)
+            )
+        await ctx.send(f"Analysis store: {self.store.cache.stat()}")
+
 
 async def setup(bot: base.Bot):
     """Set up the extension.
@@ -500,4 +2180,18 @@ async def teardown(bot: base.Bot):
     Args:
         bot: Bot that unloads the extension.
     """
+    cog = bot.get_cog("Chessboard")
+    if isinstance(cog, GameCog):
+        for view in list(cog.views):
+            view.close()
+        for page in list(cog.pages):
+            page.close()
+        await cog.http.close()
+        await cog.pool.close()
+        cog.store.close()
+        await cog.saves.flush()
+        cog.saves.close()
+        cog.book.close()
+        for book in cog.olds:
+            book.close()
     await bot.remove_cog("Chessboard", guilds=list(bot.glds))
@@ -18,7 +18,7 @@ import secrets
 import discord
 from discord.ext import commands, tasks
 
-from .. import base
+from .. import base, page
 
 
 class MiscCog(commands.Cog, name="Miscellaneous"):
@@ -45,11 +45,7 @@ class MiscCog(commands.Cog, name="Miscellaneous"):
     async def stat(self):
         """Changes the status of the bot."""
         await self.bot.change_presence(
-            activity=discord.Game(
-                secrets.choice(
-                    self.bot.cfg["feynmanium"]["cogs"]["misc"]["stat"]
-                )
-            )
+            activity=discord.Game(secrets.choice(self.bot.cfg.cogs.misc.stat))
         )
 
     @commands.Cog.listener()
@@ -62,7 +58,11 @@ class MiscCog(commands.Cog, name="Miscellaneous"):
             ctx: Context of the command.
             err: Error of the command.
         """
-        msg = secrets.choice(self.bot.cfg["feynmanium"]["cogs"]["misc"]["err"])
+        await self.bot.finish(ctx)
+        self.bot.metrics.error(
+            "-" if ctx.command is None else ctx.command.qualified_name
+        )
+        msg = secrets.choice(self.bot.cfg.cogs.misc.err)
         await ctx.send(f"{msg}```{err}```", ephemeral=True)
 
     @commands.hybrid_command()
@@ -86,9 +86,7 @@ class MiscCog(commands.Cog, name="Miscellaneous"):
         self, ctx: commands.Context[base.Bot], *, qry: str = "Is it?"
     ):
         """Asks the magic 8-ball."""
-        result = secrets.choice(
-            self.bot.cfg["feynmanium"]["cogs"]["misc"]["ball"]
-        )
+        result = secrets.choice(self.bot.cfg.cogs.misc.ball)
         await ctx.send(f"> {qry}\n{result}", ephemeral=True)
 
     @commands.hybrid_command()
@@ -97,6 +95,18 @@ class MiscCog(commands.Cog, name="Miscellaneous"):
         result = math.ceil(self.bot.latency * 1000)
         await ctx.send(f"Pong! The ping took {result} ms.", ephemeral=True)
 
+    @commands.command()
+    @commands.is_owner()
+    async def stats(self, ctx: commands.Context[base.Bot]):
+        """Shows latency and throughput metrics of commands.
+
+        Args:
+            ctx: Context of the command.
+        """
+        await page.send(
+            ctx, [f"```{self.bot.metrics.table()}```"], ephemeral=False
+        )
+
 
 async def setup(bot: base.Bot):
     """Set up the extension.
@@ -12,10 +12,225 @@ PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
 You should have received a copy of the GNU Affero General Public License along
 with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
 """
+import abc
+import asyncio
+import concurrent.futures
+import hashlib
+import typing
+
 import googletrans
 from discord.ext import commands
 
-from .. import base
+from .. import base, cache, page
+
+
+class Result(typing.NamedTuple):
+    """Result of a translation.
+
+    Attributes:
+        src: Language translated from.
+        dest: Language translated to.
+        origin: Text translated from.
+        text: Text translated to.
+    """
+
+    src: str
+    dest: str
+    origin: str
+    text: str
+
+
+class Backend(abc.ABC):
+    """Interface of translation providers."""
+
+    @abc.abstractmethod
+    async def translate(self, text: str, dest: str, src: str) -> Result:
+        """Translates text.
+
+        Args:
+            text: Text to translate.
+            dest: Language to translate to.
+            src: Language to translate from.
+
+        Returns:
+            The result of the translation.
+        """
+
+    @abc.abstractmethod
+    async def detect(self, text: str) -> str:
+        """Detects the language of text.
+
+        Args:
+            text: Text to detect its language.
+
+        Returns:
+            The code of the language.
+        """
+
+    def close(self):
+        """Releases the resources of the provider."""
+
+
+class GoogleBackend(Backend):
+    """Google Translate through googletrans.
+
+    The synchronous client runs in a thread pool, and every thread shares the
+    connection pool of one client.
+
+    Attributes:
+        api: Translator of the provider.
+        pool: Threads to run the translator.
+    """
+
+    def __init__(self, thrd: int):
+        """Initializes the provider.
+
+        Args:
+            thrd: Number of threads to run the translator.
+        """
+        self.api = googletrans.Translator()
+        self.pool = concurrent.futures.ThreadPoolExecutor(thrd)
+
+    async def translate(self, text: str, dest: str, src: str) -> Result:
+        """Translates text.
+
+        Args:
+            text: Text to translate.
+            dest: Language to translate to.
+            src: Language to translate from.
+
+        Returns:
+            The result of the translation.
+        """
+        result = await asyncio.get_running_loop().run_in_executor(
+            self.pool, self.api.translate, text, dest, src
+        )
+        return Result(result.src, result.dest, result.origin, result.text)
+
+    async def detect(self, text: str) -> str:
+        """Detects the language of text.
+
+        Args:
+            text: Text to detect its language.
+
+        Returns:
+            The code of the language.
+        """
+        result = await asyncio.get_running_loop().run_in_executor(
+            self.pool, self.api.detect, text
+        )
+        return result.lang
+
+    def close(self):
+        """Stops the threads and closes the connections."""
+        self.pool.shutdown(wait=False)
+        self.api.client.close()
+
+
+class LocalBackend(Backend):
+    """Offline stand-in that returns the text untranslated."""
+
+    async def translate(self, text: str, dest: str, src: str) -> Result:
+        """Pretends to translate text.
+
+        Args:
+            text: Text to translate.
+            dest: Language to translate to.
+            src: Language to translate from.
+
+        Returns:
+            The text as its own translation.
+        """
+        return Result("en" if src == "auto" else src, dest, text, text)
+
+    async def detect(self, text: str) -> str:
+        """Pretends to detect the language of text.
+
+        Args:
+            text: Text to detect its language.
+
+        Returns:
+            The code of English.
+        """
+        return "en"
+
+
+class CachedBackend(Backend):
+    """Provider wrapper that caches results and merges identical requests.
+
+    Attributes:
+        back: Provider to wrap.
+        cache: Results by request.
+        jobs: Requests in flight.
+    """
+
+    def __init__(self, back: Backend, size: int, ttl: float):
+        """Initializes the wrapper.
+
+        Args:
+            back: Provider to wrap.
+            size: Maximum number of cached results.
+            ttl: Time to live of cached results in seconds.
+        """
+        self.back = back
+        self.cache = cache.Cache(size, ttl=ttl)
+        self.jobs: typing.Dict[str, asyncio.Future] = {}
+
+    async def call(
+        self, key: str, func: typing.Callable[[], typing.Awaitable]
+    ) -> typing.Any:
+        """Answers a request from the cache or a shared call to the provider.
+
+        Args:
+            key: Key of the request.
+            func: Request to the provider.
+
+        Returns:
+            The result of the request.
+        """
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+        if key not in self.jobs:
+            job = asyncio.ensure_future(func())
+            self.jobs[key] = job
+            job.add_done_callback(lambda _: self.jobs.pop(key, None))
+        result = await asyncio.shield(self.jobs[key])
+        self.cache.put(key, result)
+        return result
+
+    async def translate(self, text: str, dest: str, src: str) -> Result:
+        """Translates text.
+
+        Args:
+            text: Text to translate.
+            dest: Language to translate to.
+            src: Language to translate from.
+
+        Returns:
+            The result of the translation.
+        """
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        return await self.call(
+            f"{src} {dest} {digest}",
+            lambda: self.back.translate(text, dest, src),
+        )
+
+    async def detect(self, text: str) -> str:
+        """Detects the language of text.
+
+        Args:
+            text: Text to detect its language.
+
+        Returns:
+            The code of the language.
+        """
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        return await self.call(digest, lambda: self.back.detect(text))
+
+    def close(self):
+        """Releases the resources of the provider."""
+        self.back.close()
 
 
 class TransCog(commands.Cog, name="Translation"):
@@ -26,14 +241,20 @@ class TransCog(commands.Cog, name="Translation"):
         api: Translator of the cog.
     """
 
-    def __init__(self, bot: commands.AutoShardedBot):
+    def __init__(self, bot: base.Bot):
         """Initialize the cog with a bot.
 
         Args:
             bot: Bot that contains the cog.
         """
         self.bot = bot
-        self.api = googletrans.Translator()
+        cfg = bot.cfg.cogs.trans
+        back: Backend
+        if cfg.back == "local":
+            back = LocalBackend()
+        else:
+            back = GoogleBackend(cfg.thrd)
+        self.api = CachedBackend(back, cfg.size, cfg.ttl)
 
     @commands.hybrid_command()
     async def trans(
@@ -52,7 +273,7 @@ class TransCog(commands.Cog, name="Translation"):
             src: Language to translate from.
             text: Text to translate
         """
-        result = self.api.translate(text, dest, src)
+        result = await self.api.translate(text, dest, src)
         res_src = googletrans.LANGUAGES[result.src.lower()].title()
         res_origin = result.origin
         res_dest = googletrans.LANGUAGES[result.dest.lower()].title()
@@ -70,22 +291,22 @@ class TransCog(commands.Cog, name="Translation"):
             ctx: Context of the command.
             text: Text to detect its language.
         """
-        result = self.api.detect(text)
-        res_lang = googletrans.LANGUAGES[result.lang.lower()].title()
+        result = await self.api.detect(text)
+        res_lang = googletrans.LANGUAGES[result.lower()].title()
         await ctx.send(f"{res_lang}:\n> {text}", ephemeral=True)
 
     @commands.hybrid_command()
     async def code(self, ctx):
         """List language codes."""
-        result = ", ".join(
-            [
+        await page.send(
+            ctx,
+            ["Available language codes:"]
+            + [
                 f"{key} - {value}"
                 for (key, value) in googletrans.LANGUAGES.items()
-            ]
+            ],
         )
 
-        await ctx.send(f"Available language codes:\n{result}", ephemeral=True)
-
 
 async def setup(bot: base.Bot):
     """Set up the extension.
@@ -102,4 +323,7 @@ async def teardown(bot: base.Bot):
     Args:
         bot: Bot that unloads the extension.
     """
+    cog = bot.get_cog("Translation")
+    if isinstance(cog, TransCog):
+        cog.api.close()
     await bot.remove_cog("Translation", guilds=list(bot.glds))
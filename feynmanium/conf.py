@@ -0,0 +1,427 @@
+"""This file is part of Feynmanium.
+
+Feynmanium is free software: you can redistribute it and/or modify it under the
+terms of the GNU Affero General Public License as published by the Free Software
+Foundation, either version 3 of theLicense, or (at your option) any later
+version.
+
+Feynmanium is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
+"""
+import dataclasses
+import logging
+import pathlib
+import types
+import typing
+
+from chess import engine
+from tomlkit import toml_file
+
+Strs = typing.Tuple[str, ...]
+Number = typing.Union[int, float]
+LEVELS = 22
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Base:
+    """Configuration of the bot.
+
+    Attributes:
+        exts: Extensions to load.
+        lazy: Whether to load extensions on their first command.
+        rdy: Messages printed when the bot is ready.
+        mani: Commands of lazy extensions by extension. Extensions that
+            restore persistent views are left out, so their views are
+            registered before the bot connects.
+    """
+
+    exts: Strs
+    lazy: bool
+    rdy: Strs
+    mani: typing.Mapping[str, Strs]
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Run:
+    """Configuration of the runner.
+
+    Attributes:
+        desc: Description of the bot.
+        ownr: IDs of the owners.
+        glds: IDs of the guilds of application commands.
+    """
+
+    desc: str
+    ownr: typing.Tuple[int, ...]
+    glds: typing.Tuple[int, ...]
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Cluster:
+    """Configuration of the cluster mode.
+
+    Attributes:
+        beat: Seconds between reports of workers.
+        wait: Seconds without a report before a worker is restarted.
+        show: Seconds between status logs.
+    """
+
+    beat: float
+    wait: float
+    show: float
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Log:
+    """Configuration of logging.
+
+    Attributes:
+        level: Level of the root logger.
+        size: Size in bytes to rotate the file at, 0 to rotate by age only.
+        time: Seconds between rotations by age, 0 to rotate by size only.
+        keep: Number of rotated files to keep.
+        gzip: Whether to compress rotated files.
+        json: Whether to write JSON lines.
+        levels: Levels of single loggers by name.
+    """
+
+    level: str
+    size: int
+    time: float
+    keep: int
+    gzip: bool
+    json: bool
+    levels: typing.Mapping[str, str]
+
+    def __post_init__(self):
+        """Checks the names of the levels.
+
+        Raises:
+            ValueError: A level is unknown.
+        """
+        for key, name in (
+            ("level", self.level),
+            *((f"levels.{key}", value) for (key, value) in self.levels.items()),
+        ):
+            if not isinstance(logging.getLevelName(name.upper()), int):
+                raise ValueError(f"{key} must be a logging level")
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Metric:
+    """Configuration of the metrics endpoint.
+
+    Attributes:
+        host: Host to listen on.
+        port: Port to listen on, 0 to disable.
+    """
+
+    host: str
+    port: int
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Calc:
+    """Configuration of the mathematical commands.
+
+    Attributes:
+        five: Whether to solve quintics.
+        pool: Number of workers.
+        time: Time limit of a calculation in seconds.
+        mem: Memory limit of a worker in megabytes.
+        slow: Number of workers for expensive calculations.
+        wait: Time limit of an expensive calculation in seconds.
+        size: Maximum number of cached results.
+        rows: Number of rows of numeric tables.
+        grid: Number of points of numeric grids.
+        dots: Number of points of plots.
+        imgs: Size of cached plots in megabytes.
+        file: Path of the result store, empty to keep results in memory.
+        caps: Caps of the measurements and limits of the cost.
+        cost: Weights of calculations by name.
+    """
+
+    five: bool
+    pool: int
+    time: float
+    mem: int
+    slow: int
+    wait: float
+    size: int
+    rows: int
+    grid: int
+    dots: int
+    imgs: int
+    file: str
+    caps: typing.Mapping[str, float]
+    cost: typing.Mapping[str, float]
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Game:
+    """Configuration of the chess commands.
+
+    Attributes:
+        path: Path of stockfish.
+        pool: Number of engines.
+        thrd: Threads of each engine.
+        hash: Hash size of each engine in megabytes.
+        imgs: Size of cached board images in megabytes.
+        node: Number of cached positions of each PGN.
+        size: Maximum number of stored analyses.
+        file: Path of the analysis store, empty to keep it in memory.
+        step: Depths to report while analysing.
+        rate: Minimum seconds between edits of an analysis.
+        time: Default time limit of analyses, 0 for none.
+        most: Maximum number of positions in a batch.
+        each: Maximum number of running games of a user.
+        live: Maximum number of running games.
+        sess: Path of the game store, empty to keep games in memory.
+        sync: Seconds between writes of the game store.
+        idle: Seconds of inactivity before a game ends.
+        pgns: Whether to attach the PGN after every move.
+        book: Path of the Polyglot book, empty to disable.
+        tbs: Directory of the Syzygy tablebases, empty to disable.
+        ply: Number of plies to look up in the book.
+        men: Largest number of pieces to probe in the tablebases.
+        tbl: Lowest skill level that plays tablebase moves.
+        lims: Search limits of stockfish by level, keyed by the fields of
+            engine.Limit.
+        keep: Seconds to keep stored games.
+        card: Names of the opponents by level.
+    """
+
+    path: str
+    pool: int
+    thrd: int
+    hash: int
+    imgs: int
+    node: int
+    size: int
+    file: str
+    step: typing.Tuple[int, ...]
+    rate: float
+    time: float
+    most: int
+    each: int
+    live: int
+    sess: str
+    sync: float
+    idle: float
+    pgns: bool
+    book: str
+    tbs: str
+    ply: int
+    men: int
+    tbl: int
+    lims: typing.Tuple[typing.Mapping[str, Number], ...]
+    keep: float
+    card: Strs
+
+    def __post_init__(self):
+        """Checks the search limits and the names of the levels.
+
+        Raises:
+            ValueError: A level has no entry or a search limit is unknown.
+        """
+        for key, value in (("lims", self.lims), ("card", self.card)):
+            if len(value) != LEVELS:
+                raise ValueError(f"{key} must have {LEVELS} entries")
+        names = {field.name for field in dataclasses.fields(engine.Limit)}
+        for idx, lim in enumerate(self.lims):
+            unknown = sorted(set(lim) - names)
+            if unknown:
+                raise ValueError(f"lims[{idx}] has unknown keys {unknown}")
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Trans:
+    """Configuration of the translation commands.
+
+    Attributes:
+        back: Provider of translations, "google" or "local".
+        thrd: Number of threads of the provider.
+        size: Maximum number of cached results.
+        ttl: Time to live of cached results in seconds.
+    """
+
+    back: str
+    thrd: int
+    size: int
+    ttl: float
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Misc:
+    """Configuration of the miscellaneous commands.
+
+    Attributes:
+        err: Replies to failed commands.
+        stat: Statuses of the bot.
+        ball: Answers of the magic 8-ball.
+    """
+
+    err: Strs
+    stat: Strs
+    ball: Strs
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Cogs:
+    """Configuration of the cogs.
+
+    Attributes:
+        calc: Configuration of the mathematical commands.
+        game: Configuration of the chess commands.
+        trans: Configuration of the translation commands.
+        misc: Configuration of the miscellaneous commands.
+    """
+
+    calc: Calc
+    game: Game
+    trans: Trans
+    misc: Misc
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Config:
+    """Validated snapshot of the configuration.
+
+    Attributes:
+        base: Configuration of the bot.
+        run: Configuration of the runner.
+        cluster: Configuration of the cluster mode.
+        log: Configuration of logging.
+        metric: Configuration of the metrics endpoint.
+        cogs: Configuration of the cogs.
+    """
+
+    base: Base
+    run: Run
+    cluster: Cluster
+    log: Log
+    metric: Metric
+    cogs: Cogs
+
+
+def build_table(kind: typing.Any, data: typing.Any, where: str) -> typing.Any:
+    """Converts a table of the document to a dataclass.
+
+    Args:
+        kind: Dataclass of the table.
+        data: Table in the document.
+        where: Key of the table, for errors.
+
+    Returns:
+        The converted table.
+
+    Raises:
+        ValueError: The table does not match the dataclass.
+    """
+    if not isinstance(data, dict):
+        raise ValueError(f"{where} must be a table")
+    names = {field.name for field in dataclasses.fields(kind)}
+    if set(data) != names:
+        keys = sorted(names ^ set(data))
+        raise ValueError(f"{where} has missing or unknown keys {keys}")
+    hints = typing.get_type_hints(kind)
+    values = {
+        name: build(hints[name], data[name], f"{where}.{name}")
+        for name in names
+    }
+    try:
+        return kind(**values)
+    except ValueError as exc:
+        raise ValueError(f"{where}.{exc}") from exc
+
+
+def build_union(kind: typing.Any, data: typing.Any, where: str) -> typing.Any:
+    """Converts a value of the document to the first type of a union it fits.
+
+    Args:
+        kind: Union of types of the value.
+        data: Value in the document.
+        where: Key of the value, for errors.
+
+    Returns:
+        The converted value.
+
+    Raises:
+        ValueError: The value matches no type of the union.
+    """
+    for arg in typing.get_args(kind):
+        try:
+            return build(arg, data, where)
+        except ValueError:
+            continue
+    raise ValueError(f"{where} must be of type {kind}")
+
+
+def build(kind: typing.Any, data: typing.Any, where: str) -> typing.Any:
+    """Converts a value of the document to an immutable value of a type.
+
+    Arrays become tuples and tables become dataclasses or read-only mappings.
+    Integers are accepted where floats are expected. Dataclasses may check
+    their values further in __post_init__.
+
+    Args:
+        kind: Type of the value.
+        data: Value in the document.
+        where: Key of the value, for errors.
+
+    Returns:
+        The converted value.
+
+    Raises:
+        ValueError: The value does not match the type.
+    """
+    if dataclasses.is_dataclass(kind):
+        return build_table(kind, data, where)
+    origin, args = typing.get_origin(kind), typing.get_args(kind)
+    if origin is typing.Union:
+        return build_union(kind, data, where)
+    if origin is tuple:
+        if not isinstance(data, list):
+            raise ValueError(f"{where} must be an array")
+        return tuple(
+            build(args[0], item, f"{where}[{idx}]")
+            for (idx, item) in enumerate(data)
+        )
+    if origin is not None:
+        if not isinstance(data, dict):
+            raise ValueError(f"{where} must be a table")
+        return types.MappingProxyType(
+            {
+                str(key): build(args[1], value, f"{where}.{key}")
+                for (key, value) in data.items()
+            }
+        )
+    if isinstance(data, bool) and kind is not bool:
+        raise ValueError(f"{where} must be of type {kind.__name__}")
+    if kind is float and isinstance(data, int):
+        return float(data)
+    if not isinstance(data, kind):
+        raise ValueError(f"{where} must be of type {kind.__name__}")
+    return kind(data)
+
+
+def load(path: pathlib.Path) -> Config:
+    """Reads and validates the configuration.
+
+    Args:
+        path: Path of the configuration file.
+
+    Returns:
+        The snapshot of the configuration.
+
+    Raises:
+        ValueError: The configuration is invalid.
+    """
+    document = toml_file.TOMLFile(path).read().unwrap()
+    if "feynmanium" not in document:
+        raise ValueError("feynmanium must be a table")
+    return build(Config, document["feynmanium"], "feynmanium")
@@ -0,0 +1,233 @@
+"""This file is part of Feynmanium.
+
+Feynmanium is free software: you can redistribute it and/or modify it under the
+terms of the GNU Affero General Public License as published by the Free Software
+Foundation, either version 3 of theLicense, or (at your option) any later
+version.
+
+Feynmanium is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
+"""
+import contextlib
+import copy
+import datetime
+import gzip
+import json
+import logging
+import os
+import pathlib
+import queue
+import shutil
+import time
+import typing
+from logging import handlers
+
+from . import conf
+
+TUNED: typing.Set[str] = set()
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatter of log records as JSON lines."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Formats a log record as a JSON object.
+
+        Args:
+            record: Record to format.
+
+        Returns:
+            The JSON object on one line.
+        """
+        entry = {
+            "time": datetime.datetime.fromtimestamp(
+                record.created, datetime.timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class FileHandler(handlers.RotatingFileHandler):
+    """File handler that rotates by size and by age.
+
+    Rotated files are numbered like those of the rotating file handler, and
+    compressed with gzip if enabled. The time the current file was started
+    is kept in a file next to it, so its age survives restarts.
+
+    Attributes:
+        every: Seconds between rotations by age, 0 to rotate by size only.
+        stamp: Path of the file with the start time of the log file.
+        opened: Time the current file was started.
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        size: int,
+        every: float,
+        keep: int,
+        compress: bool,
+    ):
+        """Opens the log file for appending.
+
+        Args:
+            path: Path of the log file.
+            size: Size in bytes to rotate at, 0 to rotate by age only.
+            every: Seconds between rotations by age, 0 to rotate by size only.
+            keep: Number of rotated files to keep.
+            compress: Whether to compress rotated files.
+        """
+        super().__init__(path, "a", size, keep, "utf-8")
+        self.every = every
+        self.stamp = path.with_name(f"{path.name}.time")
+        self.opened = time.time()
+        if path.stat().st_size:
+            with contextlib.suppress(OSError, ValueError):
+                self.opened = float(self.stamp.read_text())
+        self.stamp.write_text(repr(self.opened))
+        if compress:
+            self.namer = lambda name: f"{name}.gz"
+            self.rotator = compress_file
+
+    def shouldRollover(self, record: logging.LogRecord) -> int:
+        """Checks whether the file is too large or too old.
+
+        Args:
+            record: Record to write next.
+
+        Returns:
+            Whether to rotate before writing the record.
+        """
+        if 0 < self.every <= time.time() - self.opened:
+            return 1
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        """Rotates the file and restarts its age."""
+        super().doRollover()
+        self.opened = time.time()
+        self.stamp.write_text(repr(self.opened))
+
+
+def compress_file(source: str, dest: str):
+    """Compresses a rotated log file.
+
+    Args:
+        source: Path of the log file.
+        dest: Path of the compressed file.
+    """
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class QueueHandler(handlers.QueueHandler):
+    """Queue handler that keeps exceptions apart from messages."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Makes a record safe to format in another thread.
+
+        Args:
+            record: Record to prepare.
+
+        Returns:
+            The copy of the record with its message merged.
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info
+            )
+            record.exc_info = None
+        return record
+
+
+def get_level(name: str) -> int:
+    """Resolves the name of a logging level.
+
+    Args:
+        name: Name of the level in any case.
+
+    Returns:
+        The number of the level.
+
+    Raises:
+        ValueError: The level is unknown.
+    """
+    level = logging.getLevelName(name.upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown level {name}")
+    return level
+
+
+def setup(
+    cfg: conf.Log, path: pathlib.Path, quiet: int
+) -> handlers.QueueListener:
+    """Sends logging events to a rotating file from a background thread.
+
+    Args:
+        cfg: Configuration of logging.
+        path: Path of the log file.
+        quiet: Decrease of output verbosity.
+
+    Returns:
+        The listener that writes the file, to stop on exit.
+    """
+    handler = FileHandler(path, cfg.size, cfg.time, cfg.keep, cfg.gzip)
+    if cfg.json:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(
+            logging.Formatter(
+                "[{asctime}] [{levelname:<8}] {name}: {message}",
+                "%Y-%m-%d %H:%M:%S",
+                style="{",
+            )
+        )
+    events: queue.SimpleQueue = queue.SimpleQueue()
+    listener = handlers.QueueListener(events, handler)
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    sender = QueueHandler(events)
+    sender.setLevel((1 + quiet) * logging.DEBUG)
+    root.addHandler(sender)
+    tune(cfg)
+    listener.start()
+    return listener
+
+
+def tune(cfg: conf.Log):
+    """Sets the levels of the root logger and of single loggers.
+
+    Loggers set by the previous call but not by this one are reset to inherit
+    the level of their parent.
+
+    Args:
+        cfg: Configuration of logging.
+    """
+    levels = {name: get_level(level) for name, level in cfg.levels.items()}
+    root = get_level(cfg.level)
+    for name in TUNED - levels.keys():
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+    logging.getLogger().setLevel(root)
+    TUNED.clear()
+    TUNED.update(levels)
@@ -0,0 +1,288 @@
+"""This file is part of Feynmanium.
+
+Feynmanium is free software: you can redistribute it and/or modify it under the
+terms of the GNU Affero General Public License as published by the Free Software
+Foundation, either version 3 of theLicense, or (at your option) any later
+version.
+
+Feynmanium is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import bisect
+import collections
+import contextlib
+import contextvars
+import math
+import time
+import typing
+
+BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    math.inf,
+)
+
+
+class Histogram:
+    """Histogram of durations.
+
+    Attributes:
+        counts: Number of observations in each bucket.
+        sum: Sum of observations.
+        count: Number of observations.
+    """
+
+    def __init__(self):
+        """Initializes an empty histogram."""
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Records an observation.
+
+        Args:
+            value: Duration in seconds.
+        """
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, frac: float) -> float:
+        """Estimates a quantile by the upper bound of its bucket.
+
+        Args:
+            frac: Fraction of the quantile.
+
+        Returns:
+            The estimated quantile in seconds.
+        """
+        total = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            total += count
+            if total >= frac * self.count:
+                return bound
+        return math.inf
+
+
+class Span:
+    """Durations of the phases of a command.
+
+    Attributes:
+        start: Time the command started.
+        phases: Seconds spent in each phase.
+    """
+
+    def __init__(self):
+        """Starts a span."""
+        self.start = time.perf_counter()
+        self.phases: typing.Dict[str, float] = collections.defaultdict(float)
+
+
+SPAN: contextvars.ContextVar[typing.Optional[Span]] = contextvars.ContextVar(
+    "SPAN", default=None
+)
+
+
+def add(phase: str, value: float):
+    """Adds a duration to a phase of the current command.
+
+    Args:
+        phase: Phase to add to.
+        value: Duration in seconds.
+    """
+    span = SPAN.get()
+    if span is not None:
+        span.phases[phase] += value
+
+
+@contextlib.contextmanager
+def timer(phase: str) -> typing.Iterator[None]:
+    """Adds the duration of the block to a phase of the current command.
+
+    Args:
+        phase: Phase to add to.
+
+    Yields:
+        Nothing.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(phase, time.perf_counter() - start)
+
+
+class Metrics:
+    """Latency, error and in-flight metrics of commands.
+
+    Attributes:
+        hists: Histograms by command and phase.
+        errors: Number of errors by command.
+        flight: Number of running invocations by command.
+        server: Server of the metrics endpoint.
+    """
+
+    def __init__(self):
+        """Initializes empty metrics."""
+        self.hists: typing.Dict[
+            typing.Tuple[str, str], Histogram
+        ] = collections.defaultdict(Histogram)
+        self.errors: typing.Counter[str] = collections.Counter()
+        self.flight: typing.Counter[str] = collections.Counter()
+        self.server: typing.Optional[asyncio.AbstractServer] = None
+
+    def begin(self, name: str, queue: float) -> Span:
+        """Records the start of a command.
+
+        Args:
+            name: Name of the command.
+            queue: Seconds between the request and the start.
+
+        Returns:
+            The span of the command.
+        """
+        self.flight[name] += 1
+        self.hists[name, "queue"].observe(max(queue, 0))
+        span = Span()
+        SPAN.set(span)
+        return span
+
+    def end(self, name: str, span: Span):
+        """Records the end of a command.
+
+        Args:
+            name: Name of the command.
+            span: Span of the command.
+        """
+        self.flight[name] -= 1
+        self.hists[name, "total"].observe(time.perf_counter() - span.start)
+        for phase, value in span.phases.items():
+            self.hists[name, phase].observe(value)
+
+    def error(self, name: str):
+        """Records an error of a command.
+
+        Args:
+            name: Name of the command.
+        """
+        self.errors[name] += 1
+
+    def text(self) -> str:
+        """Exposes the metrics in the Prometheus text format.
+
+        Returns:
+            The exposed metrics.
+        """
+        lines = ["# TYPE feynmanium_command_seconds histogram"]
+        for (name, phase), hist in sorted(self.hists.items()):
+            labels = f'command="{name}",phase="{phase}"'
+            total = 0
+            for bound, count in zip(BUCKETS, hist.counts):
+                total += count
+                bound_str = "+Inf" if bound == math.inf else str(bound)
+                lines.append(
+                    f"feynmanium_command_seconds_bucket"
+                    f'{{{labels},le="{bound_str}"}} {total}'
+                )
+            lines.append(
+                f"feynmanium_command_seconds_sum{{{labels}}} {hist.sum}"
+            )
+            lines.append(
+                f"feynmanium_command_seconds_count{{{labels}}} {hist.count}"
+            )
+        lines.append("# TYPE feynmanium_command_errors_total counter")
+        for name, count in sorted(self.errors.items()):
+            lines.append(
+                f'feynmanium_command_errors_total{{command="{name}"}} {count}'
+            )
+        lines.append("# TYPE feynmanium_command_in_flight gauge")
+        for name, count in sorted(self.flight.items()):
+            lines.append(
+                f'feynmanium_command_in_flight{{command="{name}"}} {count}'
+            )
+        return "\n".join(lines) + "\n"
+
+    def table(self) -> str:
+        """Summarizes the metrics for humans.
+
+        Returns:
+            The summary of the metrics.
+        """
+        lines = [
+            f"{'command':<12}{'count':>7}{'p50':>8}{'p95':>8}"
+            f"{'queue':>8}{'wait':>8}{'comp':>8}{'send':>8}{'err':>5}"
+            f"{'run':>5}"
+        ]
+        names = sorted({name for (name, _) in self.hists})
+        for name in names:
+            total = self.hists[name, "total"]
+            means = [
+                self.hists[name, phase].sum / total.count
+                if total.count and (name, phase) in self.hists
+                else 0
+                for phase in ("queue", "wait", "compute", "send")
+            ]
+            lines.append(
+                f"{name:<12}{total.count:>7}"
+                f"{total.quantile(0.5):>8.3g}{total.quantile(0.95):>8.3g}"
+                + "".join(f"{mean:>8.3f}" for mean in means)
+                + f"{self.errors[name]:>5}{self.flight[name]:>5}"
+            )
+        return "\n".join(lines)
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        """Answers a request to the metrics endpoint.
+
+        Args:
+            reader: Stream to read the request.
+            writer: Stream to write the response.
+        """
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            body = self.text().encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4\r\n"
+                + f"Content-Length: {len(body)}\r\n".encode()
+                + b"Connection: close\r\n\r\n"
+                + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int):
+        """Starts the metrics endpoint.
+
+        Args:
+            host: Host to listen on.
+            port: Port to listen on.
+        """
+        self.server = await asyncio.start_server(self.handle, host, port)
+
+    async def close(self):
+        """Stops the metrics endpoint."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
@@ -0,0 +1,222 @@
+"""This file is part of Feynmanium.
+
+Feynmanium is free software: you can redistribute it and/or modify it under the
+terms of the GNU Affero General Public License as published by the Free Software
+Foundation, either version 3 of theLicense, or (at your option) any later
+version.
+
+Feynmanium is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
+"""
+import io
+import typing
+
+import discord
+from discord import ui
+from discord.ext import commands
+
+from . import base
+
+LIMIT = 2000
+FENCE = "```"
+
+
+def split(text: str, size: int = LIMIT) -> typing.List[str]:
+    """Splits a text into parts that fit in messages.
+
+    Texts are split between lines where possible. A code block that is
+    split is closed and reopened in every part.
+
+    Args:
+        text: Text to split.
+        size: Maximum length of a part.
+
+    Returns:
+        The parts of the text.
+    """
+    if len(text) <= size:
+        return [text]
+    block = text.startswith(FENCE) and text.endswith(FENCE) and len(text) > 6
+    body = text[3:-3] if block else text
+    room = size - 6 if block else size
+    parts: typing.List[str] = []
+    part = ""
+    for line in body.splitlines(keepends=True):
+        while len(line) > room:
+            if part:
+                parts.append(part)
+                part = ""
+            parts.append(line[:room])
+            line = line[room:]
+        if len(part) + len(line) > room:
+            parts.append(part)
+            part = ""
+        part += line
+    if part:
+        parts.append(part)
+    if block:
+        return [f"{FENCE}{part.rstrip(chr(10))}{FENCE}" for part in parts]
+    return parts
+
+
+def pack(chunks: typing.Iterable[str], size: int = LIMIT) -> typing.List[str]:
+    """Packs chunks of output into as few messages as possible.
+
+    Args:
+        chunks: Chunks of output in order.
+        size: Maximum length of a message.
+
+    Returns:
+        The contents of the messages.
+    """
+    pages: typing.List[str] = []
+    for chunk in chunks:
+        for part in split(chunk, size):
+            if pages and len(pages[-1]) + 1 + len(part) <= size:
+                pages[-1] += "\n" + part
+            else:
+                pages.append(part)
+    return pages
+
+
+class Pager(ui.View):
+    """View that pages through long output.
+
+    Attributes:
+        msg: Message that holds the view.
+        user: ID of the user who may turn pages.
+        pages: Contents of the pages.
+        page: Index of the current page.
+    """
+
+    def __init__(self, pages: typing.List[str], user: int):
+        """Initializes the view.
+
+        Args:
+            pages: Contents of the pages.
+            user: ID of the user who may turn pages.
+        """
+        super().__init__(timeout=300)
+        self.msg: typing.Optional[discord.Message] = None
+        self.user = user
+        self.pages = pages
+        self.page = 0
+        self.update()
+
+    def update(self):
+        """Updates the buttons for the current page."""
+        self.prev.disabled = self.page == 0
+        self.next.disabled = self.page == len(self.pages) - 1
+        self.count.label = f"{self.page + 1}/{len(self.pages)}"
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """Checks that the user who ran the command turns the pages.
+
+        Args:
+            interaction: Interaction to check.
+
+        Returns:
+            Whether the interaction is handled.
+        """
+        return interaction.user.id == self.user
+
+    async def on_timeout(self):
+        """Removes the buttons on timeout."""
+        if self.msg is not None:
+            await self.msg.edit(view=None)
+
+    async def turn(self, interaction: discord.Interaction, page: int):
+        """Shows a page.
+
+        Args:
+            interaction: Interaction of the operation.
+            page: Index of the page.
+        """
+        self.page = min(max(page, 0), len(self.pages) - 1)
+        self.update()
+        await interaction.response.edit_message(
+            content=self.pages[self.page], view=self
+        )
+
+    @ui.button(label="<")
+    async def prev(self, interaction: discord.Interaction, button: ui.Button):
+        """Go to the previous page.
+
+        Args:
+            interaction: Interaction of the operation.
+            button: Button of the operation.
+        """
+        del button
+        await self.turn(interaction, self.page - 1)
+
+    @ui.button(label="1/1", disabled=True)
+    async def count(self, interaction: discord.Interaction, button: ui.Button):
+        """Shows the number of the page.
+
+        Args:
+            interaction: Interaction of the operation.
+            button: Button of the operation.
+        """
+        del interaction, button
+
+    @ui.button(label=">")
+    async def next(self, interaction: discord.Interaction, button: ui.Button):
+        """Go to the next page.
+
+        Args:
+            interaction: Interaction of the operation.
+            button: Button of the operation.
+        """
+        del button
+        await self.turn(interaction, self.page + 1)
+
+
+async def send(
+    ctx: commands.Context[base.Bot],
+    chunks: typing.Iterable[str],
+    *,
+    most: int = 10,
+    name: str = "output.txt",
+    ephemeral: bool = True,
+) -> discord.Message:
+    """Sends output in as few messages as possible.
+
+    Output that fits in one message is sent as is. Longer output is paged
+    with buttons, and output longer than the given number of pages is
+    attached as a text file.
+
+    Args:
+        ctx: Context of the command.
+        chunks: Chunks of output in order.
+        most: Maximum number of pages.
+        name: Name of the attached file.
+        ephemeral: Whether the messages are ephemeral.
+
+    Returns:
+        The message that was sent.
+    """
+    chunks = list(chunks)
+    pages = pack(chunks)
+    if len(pages) <= 1:
+        return await ctx.send(
+            pages[0] if pages else "Nothing to show.", ephemeral=ephemeral
+        )
+    if len(pages) <= most:
+        view = Pager(pages, ctx.author.id)
+        view.msg = await ctx.send(pages[0], view=view, ephemeral=ephemeral)
+        return view.msg
+    text = "\n".join(
+        chunk[3:-3].strip("\n")
+        if chunk.startswith(FENCE) and chunk.endswith(FENCE)
+        else chunk
+        for chunk in chunks
+    )
+    return await ctx.send(
+        f"The output is too long, so it is attached ({len(text)} characters).",
+        file=discord.File(io.BytesIO(text.encode()), name),
+        ephemeral=ephemeral,
+    )
@@ -0,0 +1,612 @@
+"""This file is part of Feynmanium.
+
+Feynmanium is free software: you can redistribute it and/or modify it under the
+terms of the GNU Affero General Public License as published by the Free Software
+Foundation, either version 3 of theLicense, or (at your option) any later
+version.
+
+Feynmanium is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import collections
+import contextlib
+import contextvars
+import multiprocessing
+import pickle
+import resource
+import typing
+from multiprocessing import connection, reduction
+
+import chess
+from chess import engine
+
+from . import metric
+
+T = typing.TypeVar("T")
+
+PLAY, LOOK, BULK = range(3)
+
+
+class Claim(typing.NamedTuple):
+    """Owner and urgency of engine requests.
+
+    Attributes:
+        team: ID of the guild, 0 outside guilds.
+        user: ID of the user.
+        prio: Priority of the requests, lower first.
+    """
+
+    team: int
+    user: int
+    prio: int
+
+
+CLAIM: contextvars.ContextVar[Claim] = contextvars.ContextVar(
+    "CLAIM", default=Claim(0, 0, LOOK)
+)
+
+
+@contextlib.contextmanager
+def priority(prio: int) -> typing.Iterator[None]:
+    """Changes the priority of the engine requests of the block.
+
+    Tasks created in the block keep the priority.
+
+    Args:
+        prio: Priority of the requests, lower first.
+
+    Yields:
+        Nothing.
+    """
+    token = CLAIM.set(CLAIM.get()._replace(prio=prio))
+    try:
+        yield
+    finally:
+        CLAIM.reset(token)
+
+
+class Queue:
+    """Fair queue of waiters.
+
+    Waiters are served by priority first. Within a priority, guilds take
+    turns, and so do the users within each guild, so a flood of requests
+    from one of them only delays its own requests.
+
+    Attributes:
+        waits: Waiters by priority, guild and user, in the order of turns.
+        count: Number of waiters, including cancelled ones.
+    """
+
+    def __init__(self):
+        """Initializes an empty queue."""
+        self.waits: typing.Dict[
+            int,
+            collections.OrderedDict[
+                int, collections.OrderedDict[int, typing.Deque[asyncio.Future]]
+            ],
+        ] = {}
+        self.count = 0
+
+    def __len__(self) -> int:
+        """Counts the waiters.
+
+        Returns:
+            The number of waiters, including cancelled ones.
+        """
+        return self.count
+
+    def push(self, claim: Claim, waiter: asyncio.Future):
+        """Adds a waiter.
+
+        Args:
+            claim: Owner and urgency of the waiter.
+            waiter: Future to resolve on its turn.
+        """
+        teams = self.waits.setdefault(claim.prio, collections.OrderedDict())
+        users = teams.setdefault(claim.team, collections.OrderedDict())
+        users.setdefault(claim.user, collections.deque()).append(waiter)
+        self.count += 1
+
+    def pop(self) -> typing.Optional[asyncio.Future]:
+        """Takes the next waiter that is not cancelled.
+
+        Returns:
+            The waiter, None if there is none.
+        """
+        for prio in sorted(self.waits):
+            teams = self.waits[prio]
+            while teams:
+                team, users = next(iter(teams.items()))
+                user, waits = next(iter(users.items()))
+                waiter = waits.popleft()
+                self.count -= 1
+                if waits:
+                    users.move_to_end(user)
+                else:
+                    del users[user]
+                if users:
+                    teams.move_to_end(team)
+                else:
+                    del teams[team]
+                if not waiter.done():
+                    return waiter
+            del self.waits[prio]
+        return None
+
+
+class EnginePool:
+    """Pool of long-lived UCI engine processes.
+
+    Engines are started on demand up to the size of the pool and kept alive
+    between requests. Every request carries a game key, and the engine is
+    reset with ``ucinewgame`` whenever the key differs from the previous one.
+    Options of a request are restored to their defaults on check in.
+    Requests wait for engines in a fair queue by the claim of their context.
+
+    Attributes:
+        path: Path of the engine executable.
+        size: Maximum number of engine processes.
+        thrd: Threads used by each engine.
+        hash: Hash size of each engine in megabytes.
+        idle: Engines ready to be checked out.
+        busy: Engines currently checked out.
+        free: Number of engines that may be checked out without waiting.
+        queue: Requests waiting for an engine.
+        closed: Whether the pool is shut down.
+    """
+
+    def __init__(
+        self, path: str, size: int = 1, thrd: int = 1, hash_: int = 16
+    ):
+        """Initializes the pool without starting any engine.
+
+        Args:
+            path: Path of the engine executable.
+            size: Maximum number of engine processes.
+            thrd: Threads used by each engine.
+            hash_: Hash size of each engine in megabytes.
+        """
+        self.path, self.size, self.thrd, self.hash = path, size, thrd, hash_
+        self.idle: typing.List[
+            typing.Tuple[asyncio.SubprocessTransport, engine.UciProtocol]
+        ] = []
+        self.busy: typing.Dict[
+            engine.UciProtocol, asyncio.SubprocessTransport
+        ] = {}
+        self.free = size
+        self.queue = Queue()
+        self.closed = False
+
+    async def spawn(
+        self,
+    ) -> typing.Tuple[asyncio.SubprocessTransport, engine.UciProtocol]:
+        """Starts and configures a new engine process.
+
+        Returns:
+            The transport and the protocol of the engine.
+        """
+        transport, api = await engine.popen_uci(self.path)
+        await api.configure({"Threads": self.thrd, "Hash": self.hash})
+        return transport, api
+
+    async def wait(self):
+        """Waits for the turn of the current claim to check out an engine.
+
+        Raises:
+            RuntimeError: The pool is shut down.
+        """
+        if self.closed:
+            raise RuntimeError("The engine pool is shut down.")
+        if self.free > 0:
+            self.free -= 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self.queue.push(CLAIM.get(), waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        """Passes a checked in engine to the next waiter."""
+        waiter = self.queue.pop()
+        if waiter is None:
+            self.free += 1
+        else:
+            waiter.set_result(None)
+
+    async def get(self) -> engine.UciProtocol:
+        """Checks out an engine, starting one if none is idle.
+
+        Returns:
+            The protocol of the engine.
+        """
+        await self.wait()
+        try:
+            while self.idle:
+                transport, api = self.idle.pop()
+                if transport.get_returncode() is None:
+                    self.busy[api] = transport
+                    return api
+                transport.close()
+            transport, api = await self.spawn()
+            self.busy[api] = transport
+            return api
+        except BaseException:
+            self.release()
+            raise
+
+    async def put(self, api: engine.UciProtocol, dead: bool = False):
+        """Checks an engine back in, dropping it if it has crashed.
+
+        Args:
+            api: Protocol of the engine.
+            dead: Whether the engine is known to be terminated.
+        """
+        transport = self.busy.pop(api)
+        if self.closed or dead or transport.get_returncode() is not None:
+            await stop(transport, api)
+        else:
+            self.idle.append((transport, api))
+        self.release()
+
+    def stat(self) -> str:
+        """Summarizes the pool.
+
+        Returns:
+            The summary of the pool.
+        """
+        return (
+            f"{len(self.idle) + len(self.busy)} engines, "
+            f"{len(self.busy)} busy, {len(self.queue)} waiting"
+        )
+
+    @contextlib.asynccontextmanager
+    async def acquire(
+        self, options: typing.Optional[engine.ConfigMapping] = None
+    ) -> typing.AsyncIterator[engine.UciProtocol]:
+        """Checks out an engine for the duration of the block.
+
+        Args:
+            options: Options to apply to the engine.
+
+        Yields:
+            The protocol of the engine.
+        """
+        with metric.timer("wait"):
+            api = await self.get()
+        dead = False
+        try:
+            await api.configure(options or {})
+            yield api
+        except engine.EngineTerminatedError:
+            dead = True
+            raise
+        finally:
+            if not dead:
+                with contextlib.suppress(engine.EngineError):
+                    await api.configure(
+                        {
+                            name: api.options[name].default
+                            for name in options or {}
+                        }
+                    )
+            await self.put(api, dead)
+
+    async def run(
+        self,
+        func: typing.Callable[[engine.UciProtocol], typing.Awaitable[T]],
+        options: typing.Optional[engine.ConfigMapping] = None,
+    ) -> T:
+        """Runs a request on a pooled engine, retrying once on a crash.
+
+        Args:
+            func: Request to send to the engine.
+            options: Options to apply to the engine.
+
+        Returns:
+            The result of the request.
+        """
+        try:
+            async with self.acquire(options) as api:
+                with metric.timer("compute"):
+                    return await func(api)
+        except engine.EngineTerminatedError:
+            async with self.acquire(options) as api:
+                with metric.timer("compute"):
+                    return await func(api)
+
+    async def play(
+        self,
+        board: chess.Board,
+        limit: engine.Limit,
+        *,
+        game: object = None,
+        options: typing.Optional[engine.ConfigMapping] = None,
+    ) -> engine.PlayResult:
+        """Plays a position on a pooled engine.
+
+        Args:
+            board: Position to play.
+            limit: Search limit of the engine.
+            game: Key of the game, a new game is started if omitted.
+            options: Options to apply to the engine.
+
+        Returns:
+            The result of the engine.
+        """
+        key = object() if game is None else game
+        return await self.run(
+            lambda api: api.play(board, limit, game=key), options
+        )
+
+    async def analyse(
+        self,
+        board: chess.Board,
+        limit: engine.Limit,
+        *,
+        game: object = None,
+        options: typing.Optional[engine.ConfigMapping] = None,
+        **kwargs,
+    ) -> typing.Any:
+        """Analyses a position on a pooled engine.
+
+        Args:
+            board: Position to analyse.
+            limit: Search limit of the engine.
+            game: Key of the game, a new game is started if omitted.
+            options: Options to apply to the engine.
+            kwargs: Keyword arguments of the analysis.
+
+        Returns:
+            The information of the analysis.
+        """
+        key = object() if game is None else game
+        return await self.run(
+            lambda api: api.analyse(board, limit, game=key, **kwargs), options
+        )
+
+    async def close(self):
+        """Shuts down every engine of the pool."""
+        self.closed = True
+        waiter = self.queue.pop()
+        while waiter is not None:
+            waiter.set_exception(RuntimeError("The engine pool is shut down."))
+            waiter = self.queue.pop()
+        while self.idle:
+            await stop(*self.idle.pop())
+
+
+async def stop(transport: asyncio.SubprocessTransport, api: engine.UciProtocol):
+    """Stops an engine process.
+
+    Args:
+        transport: Transport of the engine.
+        api: Protocol of the engine.
+    """
+    with contextlib.suppress(engine.EngineError, asyncio.TimeoutError):
+        await asyncio.wait_for(api.quit(), 1)
+    transport.close()
+
+
+def serve(conn: connection.Connection, mem: int):
+    """Runs jobs sent by a worker pool until the pipe is closed.
+
+    Args:
+        conn: Pipe to the pool.
+        mem: Memory limit of the process in megabytes, 0 for unlimited.
+    """
+    if mem > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (mem << 20, mem << 20))
+    while True:
+        try:
+            func, args = conn.recv()
+        except EOFError:
+            return
+        try:
+            result = (True, func(*args))
+        except Exception as err:  # pylint: disable=broad-except
+            result = (False, err)
+        try:
+            conn.send(result)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            conn.send((False, RuntimeError(str(result[1]))))
+
+
+class Worker:
+    """Worker process of a worker pool.
+
+    Attributes:
+        proc: Process of the worker.
+        conn: Pipe to the worker.
+        ready: Whether the worker is waiting for a job.
+    """
+
+    def __init__(self, ctx: typing.Any, mem: int):
+        """Starts the worker process.
+
+        Args:
+            ctx: Multiprocessing context to start the process with.
+            mem: Memory limit of the process in megabytes, 0 for unlimited.
+        """
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=serve, args=(child, mem), daemon=True)
+        self.proc.start()
+        child.close()
+        self.ready = True
+
+    async def call(self, func: typing.Callable[..., T], args: tuple) -> T:
+        """Runs a job on the worker.
+
+        Args:
+            func: Function to call in the worker.
+            args: Arguments of the function.
+
+        Returns:
+            The result of the function.
+
+        Raises:
+            RuntimeError: The job cannot be pickled or the worker has died.
+        """
+        try:
+            job = reduction.ForkingPickler.dumps((func, args))
+        except (pickle.PicklingError, TypeError, AttributeError) as err:
+            raise RuntimeError(f"The job cannot be sent: {err}") from err
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        self.ready = False
+        self.conn.send_bytes(job)
+        loop.add_reader(self.conn.fileno(), readable.set_result, None)
+        try:
+            await readable
+        finally:
+            loop.remove_reader(self.conn.fileno())
+        try:
+            success, result = self.conn.recv()
+        except (EOFError, OSError) as err:
+            raise RuntimeError("The worker has died.") from err
+        self.ready = True
+        if success:
+            return result
+        raise result
+
+    def kill(self):
+        """Kills the worker process."""
+        self.conn.close()
+        self.proc.kill()
+        self.proc.join()
+
+
+class WorkerPool:
+    """Pool of worker processes with hard time limits.
+
+    Jobs are sent to idle workers over pipes, so the event loop never runs
+    them. A worker that exceeds the time limit is killed and replaced.
+
+    Attributes:
+        size: Maximum number of worker processes.
+        time: Time limit of a job in seconds.
+        mem: Memory limit of a worker in megabytes, 0 for unlimited.
+        ctx: Multiprocessing context to start workers with.
+        idle: Workers ready to take a job.
+        busy: Number of workers running a job.
+        cond: Condition notified when a worker is released.
+        closed: Whether the pool is shut down.
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        time: float = 10,
+        mem: int = 0,
+        preload: typing.Sequence[str] = (),
+    ):
+        """Initializes the pool without starting any worker.
+
+        Args:
+            size: Maximum number of worker processes.
+            time: Time limit of a job in seconds.
+            mem: Memory limit of a worker in megabytes, 0 for unlimited.
+            preload: Modules to import before forking workers.
+        """
+        self.size, self.time, self.mem = size, time, mem
+        self.ctx: typing.Any = multiprocessing.get_context("forkserver")
+        self.ctx.set_forkserver_preload(list(preload))
+        self.idle: typing.List[Worker] = []
+        self.busy = 0
+        self.cond = asyncio.Condition()
+        self.closed = False
+
+    async def get(self) -> Worker:
+        """Takes an idle worker, starting one if the pool is not full.
+
+        Returns:
+            The worker.
+
+        Raises:
+            RuntimeError: The pool is shut down.
+        """
+        async with self.cond:
+            await self.cond.wait_for(
+                lambda: self.closed
+                or self.idle
+                or len(self.idle) + self.busy < self.size
+            )
+            if self.closed:
+                raise RuntimeError("The worker pool is shut down.")
+            self.busy += 1
+            if self.idle:
+                return self.idle.pop()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, Worker, self.ctx, self.mem
+            )
+        except BaseException:
+            await self.put(None)
+            raise
+
+    async def put(self, worker: typing.Optional[Worker]):
+        """Releases a worker, dropping it if it is gone.
+
+        Args:
+            worker: Worker to release, None if it is gone.
+        """
+        async with self.cond:
+            self.busy -= 1
+            if worker is not None:
+                if self.closed:
+                    worker.kill()
+                else:
+                    self.idle.append(worker)
+            self.cond.notify()
+
+    async def run(
+        self,
+        func: typing.Callable[..., T],
+        *args,
+        time: typing.Optional[float] = None,
+    ) -> T:
+        """Runs a job on a worker.
+
+        Args:
+            func: Function to call in the worker, must be picklable.
+            args: Arguments of the function, must be picklable.
+            time: Time limit of the job, the limit of the pool if omitted.
+
+        Returns:
+            The result of the function.
+
+        Raises:
+            TimeoutError: The job exceeds the time limit.
+        """
+        limit = self.time if time is None else time
+        with metric.timer("wait"):
+            worker = await self.get()
+        try:
+            with metric.timer("compute"):
+                return await asyncio.wait_for(worker.call(func, args), limit)
+        except asyncio.TimeoutError as err:
+            raise TimeoutError(
+                f"The job took longer than {limit} seconds."
+            ) from err
+        finally:
+            if worker.ready:
+                await self.put(worker)
+            else:
+                worker.kill()
+                await self.put(None)
+
+    async def close(self):
+        """Shuts down every worker of the pool."""
+        async with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+            while self.idle:
+                self.idle.pop().kill()
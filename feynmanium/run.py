@@ -14,16 +14,108 @@ with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
 """
 import argparse
 import asyncio
-import logging
+import dataclasses
 import pathlib
+import signal
 import typing
+from multiprocessing import connection
 
 import discord
 import uvloop
 from discord.ext import commands
-from tomlkit import toml_file
 
-from . import base
+from . import base, cluster, conf, logs
+
+
+def get_bot(config: conf.Config, path: pathlib.Path, **kwargs) -> base.Bot:
+    """Creates the bot from its configuration.
+
+    Args:
+        config: Configuration of the bot.
+        path: File to reload configuration from.
+        kwargs: Other arguments of the bot, such as its shards.
+
+    Returns:
+        The bot.
+    """
+    guilds = [discord.Object(guild) for guild in config.run.glds]
+    return base.Bot(
+        commands.when_mentioned,
+        config=config,
+        path=path,
+        guilds=guilds,
+        help_command=commands.DefaultHelpCommand(dm_help=None),
+        case_insensitive=True,
+        description=config.run.desc,
+        owner_ids=config.run.ownr,
+        intents=discord.Intents.default(),
+        **kwargs,
+    )
+
+
+def work(
+    conn: connection.Connection,
+    conf_file: pathlib.Path,
+    log_file: pathlib.Path,
+    quiet: int,
+    token: str,
+    dry: bool,
+    ids: typing.List[int],
+    count: int,
+):
+    """Execute some shards of the bot as a worker of a cluster.
+
+    Args:
+        conn: Pipe to the supervisor.
+        conf_file: File to read configuration.
+        log_file: File of the supervisor to record logging events.
+        quiet: Decrease of output verbosity.
+        token: Token of the bot.
+        dry: Whether to skip connecting to Discord.
+        ids: Shards to run.
+        count: Total number of shards.
+    """
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    config = conf.load(conf_file)
+    config = dataclasses.replace(
+        config, metric=dataclasses.replace(config.metric, port=0)
+    )
+    name = f"{ids[0]}-{ids[-1]}" if ids else "none"
+    listener = logs.setup(
+        config.log,
+        log_file.with_name(f"{log_file.stem}.{name}{log_file.suffix}"),
+        quiet,
+    )
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    bot = get_bot(config, conf_file, shard_ids=ids, shard_count=count)
+    try:
+        asyncio.run(cluster.serve(bot, conn, token, dry, config.cluster.beat))
+    finally:
+        listener.stop()
+
+
+def get_shards(
+    parser: argparse.ArgumentParser, args: argparse.Namespace
+) -> typing.Tuple[int, int, int]:
+    """Checks the shards of a cluster.
+
+    Args:
+        parser: Parser of the arguments, to report errors.
+        args: Parsed arguments.
+
+    Returns:
+        The index of the host, the number of hosts and the number of shards.
+    """
+    try:
+        index, hosts = (int(part) for part in args.host.split("/"))
+    except ValueError:
+        parser.error("--host must be INDEX/COUNT")
+    if not 0 <= index < hosts:
+        parser.error("the index of --host must be less than its count")
+    count = args.shards or args.procs * hosts
+    if count < args.procs * hosts:
+        parser.error("--shards must be at least --procs times the hosts")
+    return index, hosts, count
 
 
 def main():
@@ -50,6 +142,30 @@ def main():
         default=0,
         help="decrease output verbosity",
     )
+    parser.add_argument(
+        "-p",
+        "--procs",
+        default=0,
+        type=int,
+        help="the number of processes to run shards in, 0 for one bot",
+    )
+    parser.add_argument(
+        "-s",
+        "--shards",
+        default=0,
+        type=int,
+        help="the total number of shards, the number of processes if 0",
+    )
+    parser.add_argument(
+        "--host",
+        default="0/1",
+        help="the index and the number of hosts as INDEX/COUNT",
+    )
+    parser.add_argument(
+        "--dry",
+        action="store_true",
+        help="run the cluster without connecting to Discord",
+    )
     parser.add_argument("token", help="the token of the bot")
     args = parser.parse_args()
     (conf_file, log_file, quiet, token) = (
@@ -58,21 +174,31 @@ def main():
         args.quiet,
         args.token,
     )
-    handler = logging.FileHandler(filename=log_file, encoding="utf-8", mode="w")
-    config: typing.Any = toml_file.TOMLFile(conf_file).read()
-
-    guilds = [
-        discord.Object(guild) for guild in config["feynmanium"]["run"]["glds"]
-    ]
-    bot = base.Bot(
-        commands.when_mentioned,
-        config=config,
-        guilds=guilds,
-        help_command=commands.DefaultHelpCommand(dm_help=None),
-        case_insensitive=True,
-        description=config["feynmanium"]["run"]["desc"],
-        owner_ids=config["feynmanium"]["run"]["ownr"],
-        intents=discord.Intents.default(),
-    )
+    try:
+        config = conf.load(conf_file)
+    except ValueError as exc:
+        parser.error(f"invalid configuration: {exc}")
     asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
-    bot.run(token, log_handler=handler, log_level=(1 + quiet) * logging.DEBUG)
+    if args.procs > 0:
+        index, hosts, count = get_shards(parser, args)
+        groups = cluster.split(
+            cluster.split(list(range(count)), hosts)[index], args.procs
+        )
+        listener = logs.setup(config.log, log_file, quiet)
+        try:
+            cluster.Cluster(
+                config,
+                work,
+                (conf_file, log_file, quiet, token, args.dry),
+                groups,
+                count,
+            ).run()
+        finally:
+            listener.stop()
+        return
+    listener = logs.setup(config.log, log_file, quiet)
+    bot = get_bot(config, conf_file)
+    try:
+        bot.run(token, log_handler=None)
+    finally:
+        listener.stop()
@@ -0,0 +1,60 @@
+"""This file is part of Feynmanium.
+
+Feynmanium is free software: you can redistribute it and/or modify it under the
+terms of the GNU Affero General Public License as published by the Free Software
+Foundation, either version 3 of theLicense, or (at your option) any later
+version.
+
+Feynmanium is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
+"""
+import math
+import unittest
+
+from feynmanium.cogs import calc
+
+
+class ZerosTest(unittest.TestCase):
+    """Tests of the numeric zeros."""
+
+    def test_roots(self):
+        """Finds the zeros of a polynomial between grid points."""
+        zeros = calc.get_zeros("x", "-3", "3", "x**2 - 2", 100)
+        self.assertEqual(len(zeros), 2)
+        for zero, want in zip(zeros, (-math.sqrt(2), math.sqrt(2))):
+            self.assertAlmostEqual(zero, want)
+
+    def test_exact(self):
+        """Keeps zeros that fall on the grid."""
+        self.assertEqual(calc.get_zeros("x", "-1", "1", "x", 201), [0.0])
+
+    def test_poles(self):
+        """Drops sign changes across poles, on and between grid points."""
+        for size in (200, 201):
+            self.assertEqual(calc.get_zeros("x", "-1", "1", "1/x", size), [])
+        zeros = calc.get_zeros("x", "-3", "3", "tan(x)", 1000)
+        self.assertEqual(len(zeros), 1)
+        self.assertAlmostEqual(zeros[0], 0.0)
+
+    def test_pole_and_zero(self):
+        """Keeps a zero next to a pole."""
+        zeros = calc.get_zeros("x", "0", "3", "(x - 1)/(x - 2)", 301)
+        self.assertEqual(len(zeros), 1)
+        self.assertAlmostEqual(zeros[0], 1.0)
+
+
+class PlotTest(unittest.TestCase):
+    """Tests the numeric plot."""
+
+    def test_empty(self):
+        """Rejects an empty range."""
+        with self.assertRaisesRegex(ValueError, "empty"):
+            calc.get_plot("x", "1", "1", "x**2", 101)
+
+
+if __name__ == "__main__":
+    unittest.main()
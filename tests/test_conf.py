@@ -0,0 +1,55 @@
+"""This file is part of Feynmanium.
+
+Feynmanium is free software: you can redistribute it and/or modify it under the
+terms of the GNU Affero General Public License as published by the Free Software
+Foundation, either version 3 of theLicense, or (at your option) any later
+version.
+
+Feynmanium is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
+"""
+import pathlib
+import unittest
+
+from tomlkit import toml_file
+
+from feynmanium import conf
+
+PATH = pathlib.Path(__file__).parents[1] / "config.toml"
+
+
+class GameTest(unittest.TestCase):
+    """Tests the checks of the chess configuration."""
+
+    def setUp(self):
+        """Reads the chess table of the shipped configuration."""
+        document = toml_file.TOMLFile(PATH).read().unwrap()
+        self.data = document["feynmanium"]["cogs"]["game"]
+
+    def test_shipped(self):
+        """The shipped configuration has an entry for each level."""
+        cfg = conf.load(PATH).cogs.game
+        self.assertEqual(len(cfg.lims), conf.LEVELS)
+        self.assertEqual(len(cfg.card), conf.LEVELS)
+
+    def test_count(self):
+        """Search limits missing a level are rejected."""
+        self.data["lims"].pop()
+        with self.assertRaisesRegex(ValueError, r"^game\.lims must have 22"):
+            conf.build(conf.Game, self.data, "game")
+
+    def test_keys(self):
+        """Search limits with unknown keys are rejected."""
+        self.data["lims"][3] = {"nodes": 10, "dpeth": 5}
+        with self.assertRaisesRegex(
+            ValueError, r"^game\.lims\[3\] has unknown keys \['dpeth'\]"
+        ):
+            conf.build(conf.Game, self.data, "game")
+
+
+if __name__ == "__main__":
+    unittest.main()
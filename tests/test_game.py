@@ -0,0 +1,133 @@
+"""This file is part of Feynmanium.
+
+Feynmanium is free software: you can redistribute it and/or modify it under the
+terms of the GNU Affero General Public License as published by the Free Software
+Foundation, either version 3 of theLicense, or (at your option) any later
+version.
+
+Feynmanium is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import typing
+import unittest
+from unittest import mock
+
+import chess
+from chess import engine
+
+from feynmanium import pool
+from feynmanium.cogs import game
+
+BLACK = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+
+
+def get_view(session: game.Session) -> game.ChessView:
+    """Creates the view of a game without engines.
+
+    Args:
+        session: State of the game.
+
+    Returns:
+        The view of the game.
+    """
+    return game.ChessView(
+        session,
+        engines=typing.cast(pool.EnginePool, None),
+        images=game.Renderer(0),
+        games=game.Registry(1, 1),
+        saves=game.GameStore(""),
+    )
+
+
+class TextTest(unittest.IsolatedAsyncioTestCase):
+    """Tests the movetext kept by the chess view."""
+
+    async def check(self, start: str, sans: typing.List[str]):
+        """Checks the movetext against a replay of the game.
+
+        Args:
+            start: FEN of the starting position.
+            sans: Moves to make in SAN.
+        """
+        session = game.Session(0, "", "", chess.WHITE, 1, start)
+        view = get_view(session)
+        board = session.board()
+        for san in sans:
+            view.push(board, board.parse_san(san))
+        replay = chess.Board(start).variation_san(board.move_stack)
+        self.assertEqual(view.text, replay)
+        self.assertEqual(get_view(session).text, replay)
+        view.end()
+
+    async def test_white(self):
+        """Games from the starting position number every white move."""
+        await self.check(chess.STARTING_FEN, ["e4", "e5", "Nf3", "Nc6"])
+
+    async def test_black(self):
+        """Games started by black number the first black move."""
+        await self.check(BLACK, ["e5", "Nf3", "Nc6", "Bb5"])
+
+
+class PonderTest(unittest.IsolatedAsyncioTestCase):
+    """Tests the reuse of pondered searches."""
+
+    async def asyncSetUp(self):
+        """Starts a game after 1. e4 that ponders on 1... e5."""
+        self.session = game.Session(0, "", "", chess.BLACK, 1)
+        self.view = get_view(self.session)
+        self.board = self.session.board()
+        self.view.push(self.board, self.board.parse_san("e4"))
+        self.fresh = engine.PlayResult(chess.Move.from_uci("b1c3"), None)
+        patcher = mock.patch.object(
+            game, "get_play", mock.AsyncMock(return_value=self.fresh)
+        )
+        self.get_play = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        """Ends the game."""
+        self.view.end()
+
+    async def reply(self, job: asyncio.Future) -> engine.PlayResult:
+        """Plays 1... e5 while the view ponders on it.
+
+        Args:
+            job: Pondered search.
+
+        Returns:
+            The reply of the view.
+        """
+        self.view.ponder = (chess.Move.from_uci("e7e5"), job)
+        self.view.push(self.board, self.board.parse_san("e5"))
+        return await self.view.reply(self.board)
+
+    async def test_hit(self):
+        """A pondered search of the played move is reused."""
+        job = asyncio.get_running_loop().create_future()
+        result = engine.PlayResult(chess.Move.from_uci("g1f3"), None)
+        job.set_result(result)
+        self.assertIs(await self.reply(job), result)
+        self.get_play.assert_not_called()
+
+    async def test_error(self):
+        """A pondered search that failed is searched again."""
+        job = asyncio.get_running_loop().create_future()
+        job.set_exception(RuntimeError("The engine pool is shut down."))
+        self.assertIs(await self.reply(job), self.fresh)
+        self.get_play.assert_awaited_once()
+
+    async def test_cancelled(self):
+        """A pondered search that was cancelled is searched again."""
+        job = asyncio.get_running_loop().create_future()
+        job.cancel()
+        self.assertIs(await self.reply(job), self.fresh)
+        self.get_play.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""This file is part of Feynmanium.
+
+Feynmanium is free software: you can redistribute it and/or modify it under the
+terms of the GNU Affero General Public License as published by the Free Software
+Foundation, either version 3 of theLicense, or (at your option) any later
+version.
+
+Feynmanium is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import typing
+import unittest
+
+from feynmanium import pool
+
+
+def start(
+    engines: pool.EnginePool, team: int, user: int, prio: int = pool.LOOK
+) -> asyncio.Task:
+    """Waits for an engine under a claim in a new task.
+
+    Args:
+        engines: Pool to wait on.
+        team: ID of the guild.
+        user: ID of the user.
+        prio: Priority of the request.
+
+    Returns:
+        The task of the wait.
+    """
+    token = pool.CLAIM.set(pool.Claim(team, user, prio))
+    try:
+        return asyncio.create_task(engines.wait())
+    finally:
+        pool.CLAIM.reset(token)
+
+
+class WaitTest(unittest.IsolatedAsyncioTestCase):
+    """Tests the fair queue of a pool with one engine."""
+
+    async def asyncSetUp(self):
+        """Checks out the only engine of the pool."""
+        self.engines = pool.EnginePool("", 1)
+        await self.engines.wait()
+
+    async def serve(self, tasks: typing.List[asyncio.Task]) -> typing.List[int]:
+        """Checks in the engine until every waiter was served.
+
+        Args:
+            tasks: Waiters that are queued.
+
+        Returns:
+            The indices of the waiters in the order they were served.
+        """
+        await asyncio.sleep(0)
+        order = []
+        for _ in tasks:
+            self.engines.release()
+            await asyncio.sleep(0)
+            order += [
+                i
+                for i, task in enumerate(tasks)
+                if task.done() and i not in order
+            ]
+        return order
+
+    async def test_prio(self):
+        """Moves in games are served before bulk analyses."""
+        tasks = [
+            start(self.engines, 1, 1, pool.BULK),
+            start(self.engines, 2, 2, pool.PLAY),
+        ]
+        self.assertEqual(await self.serve(tasks), [1, 0])
+
+    async def test_turns(self):
+        """Guilds take turns, and so do the users within a guild."""
+        tasks = [
+            start(self.engines, 1, 1),
+            start(self.engines, 1, 1),
+            start(self.engines, 1, 2),
+            start(self.engines, 2, 3),
+        ]
+        self.assertEqual(await self.serve(tasks), [0, 3, 2, 1])
+
+    async def test_queued(self):
+        """A waiter cancelled in the queue is skipped."""
+        task = start(self.engines, 1, 1)
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.sleep(0)
+        self.engines.release()
+        self.assertEqual(self.engines.free, 1)
+        self.assertEqual(len(self.engines.queue), 0)
+
+    async def test_served(self):
+        """A waiter cancelled after its turn gives back the engine."""
+        task = start(self.engines, 1, 1)
+        await asyncio.sleep(0)
+        self.engines.release()
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(self.engines.free, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+"""This file is part of Feynmanium.
+
+Feynmanium is free software: you can redistribute it and/or modify it under the
+terms of the GNU Affero General Public License as published by the Free Software
+Foundation, either version 3 of theLicense, or (at your option) any later
+version.
+
+Feynmanium is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along
+with Feynmanium. If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import unittest
+from unittest import mock
+
+from feynmanium.cogs import trans
+
+
+class CountingBackend(trans.LocalBackend):
+    """Local provider that counts its calls and can be held or failed.
+
+    Attributes:
+        calls: Number of calls to the provider.
+        gate: Event that calls wait for.
+        error: Error to raise from calls, None to succeed.
+    """
+
+    def __init__(self):
+        """Initializes the provider with the gate open."""
+        self.calls = 0
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.error: BaseException | None = None
+
+    async def translate(self, text: str, dest: str, src: str) -> trans.Result:
+        """Counts a translation and returns the text untranslated.
+
+        Args:
+            text: Text to translate.
+            dest: Language to translate to.
+            src: Language to translate from.
+
+        Returns:
+            The text as its own translation.
+        """
+        self.calls += 1
+        await self.gate.wait()
+        if self.error is not None:
+            raise self.error
+        return await super().translate(text, dest, src)
+
+
+class CachedBackendTest(unittest.IsolatedAsyncioTestCase):
+    """Tests of the cached provider with the local provider."""
+
+    def setUp(self):
+        """Wraps a counting provider."""
+        self.back = CountingBackend()
+        self.api = trans.CachedBackend(self.back, 16, 60)
+
+    async def test_hit(self):
+        """Answers a repeated request from the cache."""
+        first = await self.api.translate("hello", "fr", "auto")
+        second = await self.api.translate("hello", "fr", "auto")
+        self.assertEqual(first, trans.Result("en", "fr", "hello", "hello"))
+        self.assertEqual(first, second)
+        self.assertEqual(self.back.calls, 1)
+        await self.api.translate("hello", "de", "auto")
+        self.assertEqual(self.back.calls, 2)
+
+    async def test_detect(self):
+        """Caches detections apart from translations."""
+        self.assertEqual(await self.api.detect("hello"), "en")
+        self.assertEqual(await self.api.detect("hello"), "en")
+
+    async def test_expiry(self):
+        """Calls the provider again after the time to live."""
+        with mock.patch("time.time", return_value=1000.0) as clock:
+            await self.api.translate("hello", "fr", "auto")
+            clock.return_value = 1059.0
+            await self.api.translate("hello", "fr", "auto")
+            self.assertEqual(self.back.calls, 1)
+            clock.return_value = 1061.0
+            await self.api.translate("hello", "fr", "auto")
+            self.assertEqual(self.back.calls, 2)
+
+    async def test_merge(self):
+        """Merges identical requests in flight into one call."""
+        self.back.gate.clear()
+        jobs = [
+            asyncio.create_task(self.api.translate("hello", "fr", "auto"))
+            for _ in range(5)
+        ]
+        while not self.back.calls:
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        self.assertEqual(self.back.calls, 1)
+        self.back.gate.set()
+        results = await asyncio.gather(*jobs)
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(self.back.calls, 1)
+        self.assertFalse(self.api.jobs)
+
+    async def test_error(self):
+        """Passes errors to every waiter without caching them."""
+        self.back.gate.clear()
+        self.back.error = RuntimeError("down")
+        jobs = [
+            asyncio.create_task(self.api.translate("hello", "fr", "auto"))
+            for _ in range(3)
+        ]
+        while not self.back.calls:
+            await asyncio.sleep(0)
+        self.back.gate.set()
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+        self.assertTrue(
+            all(isinstance(result, RuntimeError) for result in results)
+        )
+        self.assertEqual(self.back.calls, 1)
+        self.back.error = None
+        await self.api.translate("hello", "fr", "auto")
+        self.assertEqual(self.back.calls, 2)
+
+
+class BackendTest(unittest.TestCase):
+    """Tests of the interface of providers."""
+
+    def test_abstract(self):
+        """Refuses to create a provider without its methods."""
+
+        class Partial(trans.Backend):  # pylint: disable=abstract-method
+            """Provider that only detects languages."""
+
+            async def detect(self, text: str) -> str:
+                """Detects every text as English."""
+                return "en"
+
+        with self.assertRaises(TypeError):
+            Partial()  # pylint: disable=abstract-class-instantiated
+
+
+if __name__ == "__main__":
+    unittest.main()